@@ -97,7 +97,7 @@ def _serialize_scan_result(result) -> dict:
         "npi": result.npi,
         "overall_score": round(result.overall_score, 3),
         "num_flags": len(result.red_flags),
-        "flag_types": sorted({f.flag_type.value for f in result.red_flags}),
+        "flag_types": sorted(result.flag_types),
         "red_flags": [
             {
                 "flag_type": f.flag_type.value,
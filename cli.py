@@ -2,11 +2,10 @@ import csv
 from pathlib import Path
 
 import click
+import pandas as pd
 
 from data.fetch import find_dataset
 from data.loader import find_preprocessed, preprocess
-from profiler.dossier import build_dossier
-from reports.pdf import generate_dossier_pdf
 from scanner.anomalies import scan_all
 
 OUTPUT_DIR = Path(__file__).parent / "output"
@@ -73,24 +72,27 @@ def scan(threshold: float, data_path: str | None, top: int, state: str | None):
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     output_path = OUTPUT_DIR / "scan_results.csv"
 
-    with open(output_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["rank", "npi", "score", "num_flags", "flag_types"])
-        for i, result in enumerate(results, 1):
-            flag_types = ", ".join(set(f.flag_type.value for f in result.red_flags))
-            writer.writerow([
-                i, result.npi,
-                f"{result.overall_score:.3f}", len(result.red_flags), flag_types,
-            ])
+    # Build the table column-wise and let pandas handle formatting and quoting
+    pd.DataFrame({
+        "rank": range(1, len(results) + 1),
+        "npi": [r.npi for r in results],
+        "score": [r.overall_score for r in results],
+        "num_flags": [len(r.red_flags) for r in results],
+        "flag_types": [", ".join(r.flag_types) for r in results],
+    }).to_csv(output_path, index=False, float_format="%.3f")
 
     click.echo(f"\nFull results saved to {output_path}")
     click.echo(f"\nTop {min(top, len(results))} suspicious providers:")
     click.echo("-" * 80)
 
-    for i, result in enumerate(results[:top], 1):
-        flag_summary = ", ".join(set(f.flag_type.value for f in result.red_flags))
-        click.echo(f"  {i:3d}. NPI {result.npi} | Score: {result.overall_score:.0%} | "
-                    f"Flags: {len(result.red_flags)} ({flag_summary})")
+    # Build the listing once and emit it in a single write
+    lines = [
+        f"  {i:3d}. NPI {r.npi} | Score: {r.overall_score:.0%} | "
+        f"Flags: {len(r.red_flags)} ({', '.join(r.flag_types)})"
+        for i, r in enumerate(results[:top], 1)
+    ]
+    if lines:
+        click.echo("\n".join(lines))
 
     if results:
         click.echo(f"\nTo investigate a provider, run: python cli.py profile <NPI>")
@@ -102,6 +104,10 @@ def scan(threshold: float, data_path: str | None, top: int, state: str | None):
               help="Path to dataset (auto-detected if not specified)")
 def profile(npi: str, data_path: str | None):
     """Build an evidence dossier for a specific provider."""
+    # Imported here so other commands don't pay for loading ReportLab
+    from profiler.dossier import build_dossier
+    from reports.pdf import generate_dossier_pdf
+
     filepath = Path(data_path) if data_path else find_dataset()
 
     preprocessed = find_preprocessed()
@@ -252,16 +258,21 @@ def spark_scan(threshold: float, data_path: str | None, top: int):
     with open(output_path, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["rank", "npi", "score", "num_flags", "flag_types"])
-        for i, row in enumerate(results[:top], 1):
-            writer.writerow([i, row["npi"], f"{row['overall_score']:.3f}",
-                             row["num_flags"], row["flag_types"]])
+        writer.writerows(
+            (i, row["npi"], f"{row['overall_score']:.3f}", row["num_flags"], row["flag_types"])
+            for i, row in enumerate(results[:top], 1)
+        )
     click.echo(f"Results saved to {output_path}")
 
     click.echo(f"\nTop {min(top, len(results))} suspicious providers:")
     click.echo("-" * 80)
-    for i, row in enumerate(results[:top], 1):
-        click.echo(f"  {i:3d}. NPI {row['npi']} | Score: {row['overall_score']:.0%} | "
-                   f"Flags: {row['num_flags']} ({row['flag_types']})")
+    lines = [
+        f"  {i:3d}. NPI {row['npi']} | Score: {row['overall_score']:.0%} | "
+        f"Flags: {row['num_flags']} ({row['flag_types']})"
+        for i, row in enumerate(results[:top], 1)
+    ]
+    if lines:
+        click.echo("\n".join(lines))
 
     spark.stop()
 
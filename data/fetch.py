@@ -1,11 +1,29 @@
+import http.client
 import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from pathlib import Path
 
 import click
 
+from data.loader import PROCESSED_DIR, RAW_DTYPES
+
 RAW_DATA_DIR = Path(__file__).parent / "raw"
 NPPES_API_URL = "https://npiregistry.cms.hhs.gov/api/?version=2.1&number="
+# data/raw is mounted read-only in Docker; override with NPPES_CACHE_FILE
+NPPES_CACHE_FILE = Path(os.environ.get("NPPES_CACHE_FILE", PROCESSED_DIR / "nppes_cache.sqlite"))
+NPPES_CACHE_TTL = 30 * 86_400  # registry details change on the order of months
+
+_NPPES_URL_PARTS = urllib.parse.urlsplit(NPPES_API_URL)
+# One keep-alive HTTPS connection per thread, so repeated and concurrent lookups
+# reuse TCP+TLS sessions instead of handshaking on every request.
+_local = threading.local()
 
 
 def find_dataset(data_dir: Path | None = None) -> Path:
@@ -22,8 +40,16 @@ def find_dataset(data_dir: Path | None = None) -> Path:
             "Place your Medicaid claims dataset in data/raw/ and try again."
         )
 
+    # Single directory pass; DirEntry caches stat results from the scan
+    with os.scandir(data_dir) as it:
+        entries = [
+            e for e in it
+            if not e.name.startswith(".") and e.name.endswith((".parquet", ".csv")) and e.is_file()
+        ]
+
     # Prefer Parquet, fall back to CSV
-    data_files = list(data_dir.glob("*.parquet")) or list(data_dir.glob("*.csv"))
+    parquet_files = [e for e in entries if e.name.endswith(".parquet")]
+    data_files = parquet_files or entries
     if not data_files:
         raise click.ClickException(
             f"No Parquet or CSV files found in {data_dir}. "
@@ -31,21 +57,203 @@ def find_dataset(data_dir: Path | None = None) -> Path:
         )
 
     # Return the largest file (most likely the main dataset)
-    return max(data_files, key=lambda f: f.stat().st_size)
+    largest = Path(max(data_files, key=lambda e: e.stat().st_size).path)
+    csv_path = largest.with_suffix(".csv")
+    if largest.suffix == ".parquet":
+        # A Parquet copy made by ensure_parquet is stale once its CSV is replaced
+        source = next((e for e in entries if e.path == str(csv_path)), None)
+        if source is None or source.stat().st_mtime_ns <= largest.stat().st_mtime_ns:
+            return largest
+
+    import pyarrow as pa
+
+    # Convert a CSV-only dataset once so later runs never re-parse the CSV
+    try:
+        return ensure_parquet(csv_path)
+    except (OSError, pa.ArrowException) as e:
+        # e.g. the read-only data/raw mount in Docker, or a CSV PyArrow cannot
+        # type consistently; pandas reads the CSV directly
+        click.echo(f"Could not write a Parquet copy of {csv_path.name} ({e}); using the CSV.", err=True)
+        return csv_path
+
+
+def ensure_parquet(csv_path: Path) -> Path:
+    """Return a Parquet copy of csv_path, converting it when missing or stale.
+
+    The CSV is streamed through PyArrow in record batches using the declared
+    HHS column types, so memory stays bounded regardless of file size.
+    """
+    out = csv_path.with_suffix(".parquet")
+    if out.exists() and out.stat().st_mtime_ns >= csv_path.stat().st_mtime_ns:
+        return out
+
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.parquet as pq
+
+    arrow_types = {"string": pa.string(), "Int64": pa.int64(), "Float64": pa.float64()}
+    convert_options = pv.ConvertOptions(
+        column_types={col: arrow_types[dtype] for col, dtype in RAW_DTYPES.items()},
+    )
+
+    click.echo(f"Converting {csv_path.name} to Parquet (one-time)...")
+    # Large blocks keep row groups a sensible size (one batch = one row group)
+    read_options = pv.ReadOptions(block_size=64 << 20)
+    tmp = out.with_suffix(".parquet.tmp")
+    try:
+        # Open the output before parsing anything, so an unwritable directory
+        # fails immediately instead of after reading the first CSV block
+        with tmp.open("wb") as sink:
+            reader = pv.open_csv(csv_path, read_options=read_options, convert_options=convert_options)
+            with pq.ParquetWriter(sink, reader.schema, compression="zstd") as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        # Rename only after a complete write so a partial file is never picked up
+        tmp.replace(out)
+    finally:
+        tmp.unlink(missing_ok=True)
+    click.echo(f"  -> {out} ({out.stat().st_size / 1e6:.1f} MB)")
+    return out
+
+
+def _nppes_request(path: str) -> bytes:
+    """Send one GET over this thread's keep-alive connection and return the body."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPSConnection(_NPPES_URL_PARTS.netloc, timeout=10)
+    try:
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        body = resp.read()
+    except (http.client.HTTPException, OSError):
+        conn.close()
+        _local.conn = None
+        raise
+    if resp.status in (301, 302, 303, 307, 308):
+        location = resp.getheader("Location")
+        if not location:
+            raise http.client.HTTPException(f"NPPES API returned HTTP {resp.status} without a Location")
+        # Redirects are rare (e.g. an API move); follow them with urllib, which
+        # handles other hosts and further hops, rather than the pooled connection
+        url = urllib.parse.urljoin(f"https://{_NPPES_URL_PARTS.netloc}{path}", location)
+        with urllib.request.urlopen(url, timeout=10) as redirected:
+            return redirected.read()
+    if resp.status != 200:
+        raise http.client.HTTPException(f"NPPES API returned HTTP {resp.status}")
+    return body
+
+
+def _nppes_get(npi: str) -> bytes:
+    """Fetch the raw NPPES API response for one NPI."""
+    path = f"{_NPPES_URL_PARTS.path}?{_NPPES_URL_PARTS.query}{npi}"
+    try:
+        return _nppes_request(path)
+    except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+        # The server closed an idle keep-alive connection; retry once on a new one.
+        # Timeouts and HTTP errors are not retried.
+        return _nppes_request(path)
+
+
+def _fetch_nppes(npi: str) -> tuple[bytes, dict] | None:
+    """Fetch one NPPES response as (raw body, parsed JSON); None if the request fails."""
+    try:
+        body = _nppes_get(npi)
+        # Parse the raw bytes directly (no intermediate str decode); the body is
+        # only cached if it parses, and the parsed dict is reused by the caller.
+        return body, json.loads(body)
+    except Exception:
+        return None
+
+
+def _cache_connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(NPPES_CACHE_FILE, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS nppes (npi TEXT PRIMARY KEY, fetched_at INTEGER, json BLOB)"
+    )
+    return conn
+
+
+def _cache_get(npis: list[str]) -> dict[str, bytes]:
+    """Return cached, unexpired NPPES responses for the given NPIs."""
+    if not npis or not NPPES_CACHE_FILE.exists():
+        return {}
+    cutoff = int(time.time()) - NPPES_CACHE_TTL
+    found: dict[str, bytes] = {}
+    try:
+        with closing(_cache_connect()) as conn:
+            # Chunk to stay under SQLite's bound-parameter limit
+            for i in range(0, len(npis), 900):
+                chunk = npis[i:i + 900]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(conn.execute(
+                    f"SELECT npi, json FROM nppes WHERE fetched_at > ? AND npi IN ({placeholders})",
+                    [cutoff, *chunk],
+                ).fetchall())
+    except sqlite3.Error:
+        return {}
+    return found
+
+
+def _cache_put(responses: dict[str, bytes]) -> None:
+    """Store freshly fetched NPPES responses. Cache failures are non-fatal."""
+    if not responses:
+        return
+    now = int(time.time())
+    try:
+        NPPES_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with closing(_cache_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO nppes (npi, fetched_at, json) VALUES (?, ?, ?)",
+                [(npi, now, body) for npi, body in responses.items()],
+            )
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def lookup_npis(npis: list[str], max_workers: int = 16) -> dict[str, dict]:
+    """Look up many NPIs at once. Returns {npi: provider info} like lookup_npi.
+
+    Cached responses are read in one query; misses are fetched concurrently and
+    written back in a single batch.
+    """
+    unique = list(dict.fromkeys(npis))
+    if not unique:
+        return {}
+    parsed = {npi: json.loads(body) for npi, body in _cache_get(unique).items()}
+    misses = [npi for npi in unique if npi not in parsed]
+    if misses:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(misses))) as ex:
+            fetched = {npi: res for npi, res in zip(misses, ex.map(_fetch_nppes, misses))
+                       if res is not None}
+        _cache_put({npi: body for npi, (body, _) in fetched.items()})
+        parsed.update({npi: data for npi, (_, data) in fetched.items()})
+    return {npi: _parse_nppes(npi, parsed[npi]) if npi in parsed else {} for npi in unique}
 
 
 def lookup_npi(npi: str) -> dict:
     """Look up provider details from the NPPES public registry.
 
+    Responses are cached on disk for NPPES_CACHE_TTL seconds, so repeat lookups
+    of the same NPI do not touch the network.
+
     Returns a dict with name, address, specialty, and enumeration_type,
     or an empty dict if the lookup fails.
     """
-    try:
-        resp = urllib.request.urlopen(NPPES_API_URL + npi, timeout=10)
-        data = json.loads(resp.read())
-    except Exception:
-        return {}
+    cached = _cache_get([npi]).get(npi)
+    if cached is not None:
+        data = json.loads(cached)
+    else:
+        fetched = _fetch_nppes(npi)
+        if fetched is None:
+            return {}
+        body, data = fetched
+        _cache_put({npi: body})
+    return _parse_nppes(npi, data)
+
 
+def _parse_nppes(npi: str, data: dict) -> dict:
+    """Extract name, address, specialty and entity type from an NPPES response."""
     if data.get("result_count", 0) == 0:
         return {}
 
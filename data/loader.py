@@ -1,6 +1,9 @@
+import functools
+from collections.abc import Iterator
 from pathlib import Path
 
 import click
+import numpy as np
 import pandas as pd
 
 # Column name mapping: HHS dataset -> internal names
@@ -19,6 +22,23 @@ COLUMN_MAP = {
 
 REVERSE_MAP = {v: k for k, v in COLUMN_MAP.items()}
 
+# Declared CSV dtypes for the HHS schema so read_csv skips type inference.
+# NPIs are read as strings (preserves leading zeros, avoids a later int->str cast).
+RAW_DTYPES = {
+    "BILLING_PROVIDER_NPI_NUM": "string",
+    "SERVICING_PROVIDER_NPI_NUM": "string",
+    "HCPCS_CODE": "string",
+    "CLAIM_FROM_MONTH": "string",
+    "TOTAL_UNIQUE_BENEFICIARIES": "Int64",
+    "TOTAL_CLAIMS": "Int64",
+    "TOTAL_PAID": "Float64",
+}
+# Same dtypes keyed by internal names, for CSVs that were already normalized
+CSV_DTYPES = {**RAW_DTYPES, **{internal: RAW_DTYPES[raw] for internal, raw in COLUMN_MAP.items()}}
+
+# Rows per batch when streaming the raw dataset (see iter_claims)
+STREAM_BATCH_ROWS = 1_000_000
+
 PROCESSED_DIR = Path(__file__).parent / "processed"
 PROVIDER_MONTHLY_FILE = PROCESSED_DIR / "provider_monthly.parquet"
 PROVIDER_PROCEDURE_FILE = PROCESSED_DIR / "provider_procedure.parquet"
@@ -26,91 +46,266 @@ PROVIDER_PROCEDURE_FILE = PROCESSED_DIR / "provider_procedure.parquet"
 
 def _normalize(df: pd.DataFrame) -> pd.DataFrame:
     """Rename HHS columns to internal names and cast NPI to string."""
-    rename_map = {raw: internal for raw, internal in REVERSE_MAP.items() if raw in df.columns}
+    names = set(df.columns)
+    rename_map = {raw: internal for raw, internal in REVERSE_MAP.items() if raw in names}
     if rename_map:
         df = df.rename(columns=rename_map)
-    for npi_col in ["npi", "servicing_npi"]:
-        if npi_col in df.columns:
-            df[npi_col] = df[npi_col].astype(str)
+        names = {rename_map.get(c, c) for c in names}
+    # Only cast NPI columns that aren't already strings (e.g. int64 in HHS Parquet)
+    casts = {
+        c: str for c in ("npi", "servicing_npi")
+        if c in names and not pd.api.types.is_string_dtype(df[c])
+    }
+    if casts:
+        df = df.astype(casts)
     return df
 
 
-def load_claims(filepath: Path) -> pd.DataFrame:
+def _source_columns(names: list[str], columns: list[str] | None) -> list[str] | None:
+    """Map internal column names to the matching names present in a source file."""
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [c for c in names if REVERSE_MAP.get(c, c) in wanted]
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_schema(filepath: Path, mtime_ns: int):
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(filepath)
+
+
+def read_schema(filepath: Path):
+    """Return the PyArrow schema of a Parquet file, read from its footer once.
+
+    Cached per (path, modification time), so repeated loads of the same file
+    skip re-opening it just to see which columns exist.
+    """
+    return _cached_schema(filepath, filepath.stat().st_mtime_ns)
+
+
+def load_claims(filepath: Path, columns: list[str] | None = None) -> pd.DataFrame:
     """Load claims data as a pandas DataFrame.
 
     Supports both CSV and Parquet files. Uses PyArrow engine for Parquet
     to support AVX-only hardware (unlike Polars which requires AVX2).
+
+    If columns (internal names) is given, only those columns are read from
+    disk — Parquet skips the other column chunks, CSV skips converting them.
     """
     if filepath.suffix == ".parquet":
-        df = pd.read_parquet(filepath, engine="pyarrow")
+        read_cols = _source_columns(read_schema(filepath).names, columns)
+        df = pd.read_parquet(filepath, engine="pyarrow", columns=read_cols)
     else:
-        df = pd.read_csv(filepath, dtype_backend="numpy_nullable", low_memory=False)
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda c: REVERSE_MAP.get(c, c) in wanted  # noqa: E731
+        df = pd.read_csv(filepath, dtype=CSV_DTYPES, dtype_backend="numpy_nullable",
+                         usecols=usecols, low_memory=False)
 
     return _normalize(df)
 
 
-def load_claims_for_provider(filepath: Path, npi: str) -> pd.DataFrame:
-    """Load all rows for a specific billing provider."""
+# Sorted per-provider total paid for the most recently summarized dataset, keyed
+# by (source path, modification time). scan_all records the totals it computes
+# anyway, so a dossier built in the same process reuses them as its peer group.
+_provider_totals: dict[tuple[Path, int], np.ndarray] = {}
+
+
+def remember_provider_totals(source: Path, totals: np.ndarray) -> None:
+    """Record the sorted per-provider total paid amounts computed from source."""
+    _provider_totals.clear()
+    _provider_totals[(source, source.stat().st_mtime_ns)] = totals
+
+
+def cached_provider_totals(source: Path) -> np.ndarray | None:
+    """Sorted per-provider totals recorded for source, or None if stale or absent."""
+    return _provider_totals.get((source, source.stat().st_mtime_ns))
+
+
+def clear_provider_totals() -> None:
+    """Drop the provider totals recorded by remember_provider_totals."""
+    _provider_totals.clear()
+
+
+def iter_claims(
+    filepath: Path,
+    columns: list[str] | None = None,
+    batch_size: int = STREAM_BATCH_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Yield claims as normalized DataFrames of up to batch_size rows.
+
+    Lets full-dataset aggregations run in bounded memory instead of holding
+    every raw row at once. Large batches keep per-batch overhead negligible.
+    """
+    if filepath.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        read_cols = _source_columns(read_schema(filepath).names, columns)
+        for batch in pq.ParquetFile(filepath).iter_batches(batch_size=batch_size, columns=read_cols):
+            yield _normalize(batch.to_pandas())
+    else:
+        usecols = None
+        if columns is not None:
+            wanted = set(columns)
+            usecols = lambda c: REVERSE_MAP.get(c, c) in wanted  # noqa: E731
+        with pd.read_csv(filepath, dtype=CSV_DTYPES, dtype_backend="numpy_nullable",
+                         usecols=usecols, chunksize=batch_size) as reader:
+            for chunk in reader:
+                yield _normalize(chunk)
+
+
+def load_claims_for_provider(
+    filepath: Path, npi: str, columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Load all rows for a specific billing provider.
+
+    columns (internal names) limits which columns are read; "npi" is always included.
+    """
+    return load_claims_for_providers(filepath, [npi], columns=columns)[npi]
+
+
+def load_claims_for_providers(
+    filepath: Path, npis: list[str], columns: list[str] | None = None,
+) -> dict[str, pd.DataFrame]:
+    """Load the rows of several billing providers in one read.
+
+    Returns {npi: rows} with an entry (possibly empty) for every requested NPI,
+    so batch callers decode the file once instead of once per provider.
+    columns (internal names) limits which columns are read; "npi" is always included.
+    """
+    if columns is not None and "npi" not in columns:
+        columns = ["npi", *columns]
+    wanted = list(dict.fromkeys(npis))
+    if not wanted:
+        return {}
+
     if filepath.suffix == ".parquet":
         import pyarrow as pa
         import pyarrow.parquet as pq
 
-        schema = pq.read_schema(filepath)
+        schema = read_schema(filepath)
         npi_col = "BILLING_PROVIDER_NPI_NUM" if "BILLING_PROVIDER_NPI_NUM" in schema.names else "npi"
-        # HHS parquet stores NPI as int64; cast the filter value to match
-        filter_val: int | str = int(npi) if pa.types.is_integer(schema.field(npi_col).type) else npi
-        table = pq.read_table(filepath, filters=[(npi_col, "=", filter_val)])
-        return _normalize(table.to_pandas())
+        # HHS parquet stores NPI as int64; cast the filter values to match
+        is_int = pa.types.is_integer(schema.field(npi_col).type)
+        filter_vals = [int(n) for n in wanted] if is_int else wanted
+        table = pq.read_table(filepath, columns=_source_columns(schema.names, columns),
+                              filters=[(npi_col, "in", filter_vals)])
+        df = _normalize(table.to_pandas())
+    else:
+        # Filter each batch as it is parsed so only the requested providers'
+        # rows are ever held, rather than the whole file
+        df = pd.concat(
+            [batch[batch["npi"].isin(wanted)] for batch in iter_claims(filepath, columns=columns)],
+            ignore_index=True,
+        )
+
+    groups = {npi: rows.reset_index(drop=True) for npi, rows in df.groupby("npi", sort=False)}
+    empty = df.iloc[0:0].reset_index(drop=True)
+    return {npi: groups[npi] if npi in groups else empty.copy() for npi in wanted}
+
+
+def get_all_providers(filepath: Path) -> set[str]:
+    """Get the set of unique billing provider NPIs in the dataset.
+
+    Streams the NPI column batch by batch, so memory grows with the number of
+    distinct providers rather than the number of rows.
+    """
+    npis: set[str] = set()
+    for batch in iter_claims(filepath, columns=["npi"]):
+        npis.update(batch["npi"].unique())
+    return npis
+
 
-    df = load_claims(filepath)
-    return df[df["npi"] == npi].copy().reset_index(drop=True)
+def _write_summary(df: pd.DataFrame, path: Path) -> None:
+    """Write a summary frame as zstd Parquet with per-row-group min/max statistics.
+
+    Summaries are sorted by NPI, so with small row groups a single-NPI filter
+    can skip almost every group using the min/max statistics.
+    """
+    df.to_parquet(
+        path,
+        engine="pyarrow",
+        index=False,
+        compression="zstd",
+        row_group_size=64_000,
+        write_statistics=True,
+    )
+
+
+def _sum_claims(df: pd.DataFrame, keys: list[str], dropna: bool = True) -> pd.DataFrame:
+    """Sum total_claims, total_paid and (if present) beneficiaries over keys.
+
+    Hash grouping only (sort=False). dropna=False keeps groups with missing key
+    values (e.g. no HCPCS code).
+    """
+    value_cols = [c for c in ("total_claims", "total_paid", "beneficiaries") if c in df.columns]
+    return df.groupby(keys, as_index=False, sort=False, observed=True, dropna=dropna)[value_cols].sum()
 
 
-def get_all_providers(filepath: Path) -> pd.DataFrame:
-    """Get a unique list of billing provider NPIs from the dataset."""
-    df = load_claims(filepath)
-    return df[["npi"]].drop_duplicates().reset_index(drop=True)
+def aggregate_claims(
+    filepath: Path, include_beneficiaries: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Stream filepath once and return its (monthly, procedure) summaries.
+
+    monthly has one row per (npi, service_month), procedure one row per
+    (npi, procedure_code, service_month); both carry total_claims and
+    total_paid, and monthly also beneficiaries if include_beneficiaries.
+    Rows are in no particular order.
+
+    Batches are summed at the finest grain and the partial sums re-aggregated,
+    so memory holds one raw batch plus partial sums rather than every raw row;
+    the monthly summary is then derived from the code-level sums. Rows without
+    a procedure code still count toward monthly but are left out of procedure,
+    since the code-level detectors need a code.
+    """
+    code_keys = ["npi", "procedure_code", "service_month"]
+    columns = [*code_keys, "total_claims", "total_paid"]
+    if include_beneficiaries:
+        columns.append("beneficiaries")
+    parts = [_sum_claims(chunk, code_keys, dropna=False)
+             for chunk in iter_claims(filepath, columns=columns)]
+    if not parts:
+        raise click.ClickException(f"No claims found in {filepath}")
+    code_level = _sum_claims(pd.concat(parts, ignore_index=True), code_keys, dropna=False)
+    del parts
+
+    monthly = _sum_claims(code_level, ["npi", "service_month"])
+    procedure = code_level.loc[code_level[code_keys].notna().all(axis=1),
+                               [*code_keys, "total_claims", "total_paid"]].reset_index(drop=True)
+    return monthly, procedure
 
 
 def preprocess(raw_filepath: Path) -> tuple[Path, Path]:
-    """Read the raw dataset once and write two small summary Parquet files.
+    """Stream the raw dataset once and write two small summary Parquet files.
 
     Creates:
       - provider_monthly.parquet: (npi, service_month, total_claims, total_paid,
         beneficiaries) — one row per provider per month.
-      - provider_procedure.parquet: (npi, procedure_code, total_paid, row_count)
-        — for consistency detection across procedure codes.
+      - provider_procedure.parquet: (npi, procedure_code, service_month,
+        total_claims, total_paid) — for the code-level detectors.
+
+    Both files are ordered by NPI only; rows within a provider are unordered.
 
     Returns the paths to both files.
     """
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
 
-    click.echo(f"Reading raw dataset: {raw_filepath}")
-    df = load_claims(raw_filepath)
+    click.echo(f"Streaming raw dataset: {raw_filepath}")
+    monthly, procedure = aggregate_claims(raw_filepath, include_beneficiaries=True)
 
     # --- Provider monthly summary ---
-    click.echo("Aggregating provider monthly summaries...")
-    agg_dict: dict = {"total_claims": "sum", "total_paid": "sum"}
-    if "beneficiaries" in df.columns:
-        agg_dict["beneficiaries"] = "sum"
-    monthly = (
-        df.groupby(["npi", "service_month"], as_index=False)
-        .agg(agg_dict)
-        .sort_values(["npi", "service_month"])
-        .reset_index(drop=True)
-    )
-    monthly.to_parquet(PROVIDER_MONTHLY_FILE, engine="pyarrow", index=False)
+    # Rows are only clustered by NPI for row-group pushdown; readers order the
+    # few rows of one provider themselves.
+    monthly = monthly.sort_values("npi", kind="stable").reset_index(drop=True)
+    _write_summary(monthly, PROVIDER_MONTHLY_FILE)
     click.echo(f"  -> {PROVIDER_MONTHLY_FILE} ({PROVIDER_MONTHLY_FILE.stat().st_size / 1e6:.1f} MB, {len(monthly):,} rows)")
 
     # --- Provider procedure summary (procedure-code monthly, for all code-level detectors) ---
-    click.echo("Aggregating provider procedure summaries...")
-    procedure = (
-        df.groupby(["npi", "procedure_code", "service_month"], as_index=False)
-        .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
-        .sort_values(["npi", "procedure_code", "service_month"])
-        .reset_index(drop=True)
-    )
-    procedure.to_parquet(PROVIDER_PROCEDURE_FILE, engine="pyarrow", index=False)
+    procedure = procedure.sort_values("npi", kind="stable").reset_index(drop=True)
+    _write_summary(procedure, PROVIDER_PROCEDURE_FILE)
     click.echo(f"  -> {PROVIDER_PROCEDURE_FILE} ({PROVIDER_PROCEDURE_FILE.stat().st_size / 1e6:.1f} MB, {len(procedure):,} rows)")
 
     return PROVIDER_MONTHLY_FILE, PROVIDER_PROCEDURE_FILE
@@ -1,10 +1,16 @@
 from pathlib import Path
 
 import click
+import numpy as np
 import pandas as pd
 
 from data.fetch import lookup_npi
-from data.loader import load_claims, load_claims_for_provider
+from data.loader import (
+    cached_provider_totals,
+    load_claims,
+    load_claims_for_provider,
+    remember_provider_totals,
+)
 from data.models import Dossier, Provider, ScanResult
 from scanner.hcpcs import get_description
 
@@ -64,29 +70,34 @@ def build_dossier(
 
 def _summarize_claims(claims: pd.DataFrame) -> dict:
     """Generate a summary from the provider's aggregated claims data."""
-    names = claims.columns.tolist()
+    names = set(claims.columns)
 
     summary: dict = {
         "total_rows": len(claims),
     }
 
+    # One reduction over all the summed columns instead of a call per column
+    sum_cols = [c for c in ("total_claims", "total_paid", "beneficiaries") if c in names]
+    sums = claims[sum_cols].sum() if sum_cols else {}
+
     if "total_claims" in names:
-        summary["total_claims"] = int(claims["total_claims"].sum())
+        summary["total_claims"] = int(sums["total_claims"])
 
     if "total_paid" in names:
-        summary["total_paid"] = float(claims["total_paid"].sum())
+        summary["total_paid"] = float(sums["total_paid"])
 
     if "beneficiaries" in names:
-        summary["total_beneficiaries"] = int(claims["beneficiaries"].sum())
+        summary["total_beneficiaries"] = int(sums["beneficiaries"])
 
     if "service_month" in names:
-        # Handle both "YYYY-MM" and "YYYY-MM-DD" formats
-        service_months = claims["service_month"].astype(str)
-        service_months = service_months.apply(lambda s: s + "-01" if len(s) <= 7 else s)
-        parsed = pd.to_datetime(service_months, format="%Y-%m-%d")
+        # Parse each distinct month once (many rows share a month), handling
+        # both "YYYY-MM" and "YYYY-MM-DD" formats with vectorized string ops
+        months = pd.Series(claims["service_month"].dropna().unique()).astype(str)
+        months = months.where(months.str.len() > 7, months + "-01")
+        parsed = pd.to_datetime(months, format="%Y-%m-%d")
         summary["date_range_start"] = str(parsed.min().date())
         summary["date_range_end"] = str(parsed.max().date())
-        summary["active_months"] = claims["service_month"].nunique()
+        summary["active_months"] = len(months)
 
     if "procedure_code" in names:
         grp = claims.groupby("procedure_code")
@@ -151,36 +162,35 @@ def _compare_to_peers(
     if "total_paid" not in provider_claims.columns:
         return {"note": "Peer comparison unavailable — missing total_paid column"}
 
-    if monthly_path and monthly_path.exists():
-        # Fast path: use preprocessed summary (~1MB) instead of raw file (~2.8GB)
-        peers = (
-            pd.read_parquet(monthly_path, engine="pyarrow")
-            .groupby("npi", as_index=False)["total_paid"]
-            .sum()
-            .rename(columns={"total_paid": "total_paid_sum"})
-        )
-    else:
-        df = load_claims(filepath)
-        peers = (
-            df.groupby("npi", as_index=False)["total_paid"]
-            .sum()
-            .rename(columns={"total_paid": "total_paid_sum"})
-        )
-
-    if peers.empty:
+    # Per-provider totals are shared with scan_all: reuse them when a scan of
+    # the same source already ran in this process, otherwise aggregate here.
+    source = monthly_path if monthly_path and monthly_path.exists() else filepath
+    totals = cached_provider_totals(source)
+    if totals is None:
+        if source is monthly_path:
+            # Fast path: use preprocessed summary (~1MB) instead of raw file (~2.8GB)
+            df = pd.read_parquet(monthly_path, engine="pyarrow", columns=["npi", "total_paid"])
+        else:
+            # Last resort: only the two columns needed are read from the raw file
+            df = load_claims(filepath, columns=["npi", "total_paid"])
+        # Sorted once: the median and the percentile rank both come from the
+        # sorted array (group-by sums are never NA, so a float array is safe).
+        totals = np.sort(df.groupby("npi")["total_paid"].sum().to_numpy(dtype=float))
+        remember_provider_totals(source, totals)
+
+    n = len(totals)
+    if n == 0:
         return {"note": "No peers found"}
 
     provider_total = float(provider_claims["total_paid"].sum())
-    peer_mean = float(peers["total_paid_sum"].mean())
-    peer_median = float(peers["total_paid_sum"].median())
-    peer_std = float(peers["total_paid_sum"].std())
+    peer_mean = float(totals.mean())
+    peer_median = float((totals[(n - 1) // 2] + totals[n // 2]) / 2)
+    peer_std = float(totals.std(ddof=1)) if n > 1 else float("nan")
 
-    percentile_rank = (
-        (peers["total_paid_sum"] <= provider_total).sum() / len(peers) * 100
-    )
+    percentile_rank = np.searchsorted(totals, provider_total, side="right") / n * 100
 
     comparison = {
-        "peer_count": len(peers),
+        "peer_count": n,
         "provider_total_paid": provider_total,
         "peer_mean_paid": round(peer_mean, 2),
         "peer_median_paid": round(peer_median, 2),
@@ -195,22 +205,17 @@ def _compare_to_peers(
 
 def _build_timeline(claims: pd.DataFrame) -> list[dict]:
     """Build a monthly billing timeline for the provider."""
-    if "service_month" not in claims.columns:
+    names = set(claims.columns)
+    if "service_month" not in names:
         return []
 
+    # Resolve missing columns once up front so rows use the canonical names
     grp = claims.groupby("service_month")
     monthly = pd.DataFrame({"row_count": grp.size()})
-    if "total_claims" in claims.columns:
-        monthly["total_claims"] = grp["total_claims"].sum()
-    if "total_paid" in claims.columns:
-        monthly["total_paid"] = grp["total_paid"].sum()
+    monthly["total_claims"] = grp["total_claims"].sum() if "total_claims" in names else monthly["row_count"]
+    monthly["total_paid"] = grp["total_paid"].sum() if "total_paid" in names else 0
     monthly = monthly.reset_index().sort_values("service_month")
 
-    return [
-        {
-            "month": str(row["service_month"]),
-            "total_claims": row["total_claims"] if "total_claims" in monthly.columns else row["row_count"],
-            "total_paid": row["total_paid"] if "total_paid" in monthly.columns else 0,
-        }
-        for _, row in monthly.iterrows()
-    ]
+    # Cast the month column in one vectorized step and materialize all rows at once
+    monthly["month"] = monthly["service_month"].astype(str)
+    return monthly[["month", "total_claims", "total_paid"]].to_dict("records")
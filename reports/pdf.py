@@ -1,4 +1,8 @@
+import io
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import repeat
+from operator import itemgetter
 from pathlib import Path
 
 from reportlab.lib import colors
@@ -17,12 +21,66 @@ from data.models import Dossier
 
 OUTPUT_DIR = Path(__file__).parent.parent / "output" / "dossiers"
 
+# Timeline row fields in table column order
+_TIMELINE_FIELDS = itemgetter("month", "total_claims", "total_paid")
+
 SEVERITY_COLORS = {
     "high": colors.Color(0.9, 0.2, 0.2),
     "medium": colors.Color(0.9, 0.6, 0.1),
     "low": colors.Color(0.9, 0.8, 0.2),
 }
 
+# Styles are immutable once built, so they are created once at import and
+# shared by every dossier instead of being rebuilt per PDF.
+_STYLES = getSampleStyleSheet()
+_TITLE_STYLE = ParagraphStyle("CustomTitle", parent=_STYLES["Title"], fontSize=18, spaceAfter=12)
+_HEADING_STYLE = ParagraphStyle("CustomHeading", parent=_STYLES["Heading2"], fontSize=14,
+                                spaceBefore=16, spaceAfter=8,
+                                textColor=colors.Color(0.2, 0.2, 0.4))
+_BODY_STYLE = _STYLES["BodyText"]
+_SMALL_STYLE = ParagraphStyle("Small", parent=_BODY_STYLE, fontSize=8, textColor=colors.grey)
+_SCORE_STYLES = {
+    level: ParagraphStyle("Score", parent=_BODY_STYLE, fontSize=12, textColor=color)
+    for level, color in SEVERITY_COLORS.items()
+}
+_DISCLAIMER_STYLE = ParagraphStyle("Disclaimer", parent=_SMALL_STYLE, fontSize=7, textColor=colors.grey)
+
+# Two-column label/value tables (provider info, claims summary, peer comparison)
+_KV_TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, -1), 10),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+])
+_PROCEDURE_TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
+])
+_PROCEDURE_MONTHLY_TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
+    ("FONTSIZE", (0, 0), (-1, -1), 8),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+])
+_TIMELINE_TABLE_STYLE = TableStyle([
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
+    ("FONTSIZE", (0, 0), (-1, -1), 9),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+])
+
 
 def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Path:
     """Generate a PDF dossier report for bounty submission."""
@@ -33,17 +91,17 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
     filename = f"dossier_{dossier.provider.npi}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     output_path = output_dir / filename
 
-    doc = SimpleDocTemplate(str(output_path), pagesize=letter,
+    # Render in memory and write the finished file in one call: no stream of
+    # small writes, and no truncated PDF left behind if rendering fails
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter,
                             leftMargin=0.75 * inch, rightMargin=0.75 * inch,
                             topMargin=0.75 * inch, bottomMargin=0.75 * inch)
 
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle("CustomTitle", parent=styles["Title"], fontSize=18, spaceAfter=12)
-    heading_style = ParagraphStyle("CustomHeading", parent=styles["Heading2"], fontSize=14,
-                                    spaceBefore=16, spaceAfter=8,
-                                    textColor=colors.Color(0.2, 0.2, 0.4))
-    body_style = styles["BodyText"]
-    small_style = ParagraphStyle("Small", parent=body_style, fontSize=8, textColor=colors.grey)
+    title_style = _TITLE_STYLE
+    heading_style = _HEADING_STYLE
+    body_style = _BODY_STYLE
+    small_style = _SMALL_STYLE
 
     elements = []
 
@@ -76,13 +134,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
         info_data.append(["Servicing NPI", provider.servicing_npi])
 
     info_table = Table(info_data, colWidths=[1.5 * inch, 5 * inch])
-    info_table.setStyle(TableStyle([
-        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 10),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-        ("TOPPADDING", (0, 0), (-1, -1), 4),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-    ]))
+    info_table.setStyle(_KV_TABLE_STYLE)
     elements.append(info_table)
     elements.append(Spacer(1, 12))
 
@@ -92,8 +144,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
     score_color = "high" if score >= 0.7 else "medium" if score >= 0.4 else "low"
     elements.append(Paragraph(
         f"Overall Risk Score: <b>{score:.0%}</b> ({score_label})",
-        ParagraphStyle("Score", parent=body_style, fontSize=12,
-                       textColor=SEVERITY_COLORS[score_color])
+        _SCORE_STYLES[score_color],
     ))
     elements.append(Spacer(1, 12))
 
@@ -132,13 +183,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
 
         if summary_data:
             summary_table = Table(summary_data, colWidths=[2 * inch, 4.5 * inch])
-            summary_table.setStyle(TableStyle([
-                ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                ("FONTSIZE", (0, 0), (-1, -1), 10),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-                ("TOPPADDING", (0, 0), (-1, -1), 4),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-            ]))
+            summary_table.setStyle(_KV_TABLE_STYLE)
             elements.append(summary_table)
             elements.append(Spacer(1, 8))
 
@@ -155,15 +200,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
             ]
             proc_table = Table(proc_header + proc_rows,
                                colWidths=[0.9 * inch, 3.0 * inch, 0.9 * inch, 1.2 * inch])
-            proc_table.setStyle(TableStyle([
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
-                ("FONTSIZE", (0, 0), (-1, -1), 9),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-                ("TOPPADDING", (0, 0), (-1, -1), 4),
-                ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
-            ]))
+            proc_table.setStyle(_PROCEDURE_TABLE_STYLE)
             elements.append(proc_table)
             elements.append(Spacer(1, 8))
 
@@ -186,16 +223,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
                 ])
             pm_table = Table(pm_header + pm_rows,
                              colWidths=[0.85 * inch, 0.65 * inch, 2.4 * inch, 0.65 * inch, 1.1 * inch, 0.85 * inch])
-            pm_table.setStyle(TableStyle([
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
-                ("FONTSIZE", (0, 0), (-1, -1), 8),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-                ("TOPPADDING", (0, 0), (-1, -1), 3),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-                ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
-            ]))
+            pm_table.setStyle(_PROCEDURE_MONTHLY_TABLE_STYLE)
             elements.append(pm_table)
             elements.append(Spacer(1, 8))
 
@@ -214,13 +242,7 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
             peer_data.append(["Z-Score", f"{pc['zscore']}"])
 
         peer_table = Table(peer_data, colWidths=[2 * inch, 4.5 * inch])
-        peer_table.setStyle(TableStyle([
-            ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-            ("FONTSIZE", (0, 0), (-1, -1), 10),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
-            ("TOPPADDING", (0, 0), (-1, -1), 4),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-        ]))
+        peer_table.setStyle(_KV_TABLE_STYLE)
         elements.append(peer_table)
         elements.append(Spacer(1, 8))
 
@@ -228,20 +250,14 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
     if dossier.timeline:
         elements.append(Paragraph("Monthly Billing Timeline", heading_style))
         timeline_header = [["Month", "Claims", "Total Paid"]]
+        # One C-level itemgetter call per row pulls all three cells
         timeline_rows = [
-            [t["month"], str(t["total_claims"]), f"${t['total_paid']:,.2f}"]
-            for t in dossier.timeline
+            [month, str(claims), f"${paid:,.2f}"]
+            for month, claims, paid in map(_TIMELINE_FIELDS, dossier.timeline)
         ]
         timeline_table = Table(timeline_header + timeline_rows,
                                colWidths=[2.5 * inch, 1.5 * inch, 2.5 * inch])
-        timeline_table.setStyle(TableStyle([
-            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-            ("BACKGROUND", (0, 0), (-1, 0), colors.Color(0.9, 0.9, 0.95)),
-            ("FONTSIZE", (0, 0), (-1, -1), 9),
-            ("GRID", (0, 0), (-1, -1), 0.5, colors.lightgrey),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-            ("TOPPADDING", (0, 0), (-1, -1), 3),
-        ]))
+        timeline_table.setStyle(_TIMELINE_TABLE_STYLE)
         elements.append(timeline_table)
 
     # --- Disclaimer ---
@@ -250,8 +266,26 @@ def generate_dossier_pdf(dossier: Dossier, output_dir: Path | None = None) -> Pa
         "This report is generated for informational purposes to support fraud investigation. "
         "All data is derived from publicly available HHS Medicaid claims records. "
         "Anomalies identified herein warrant further investigation and do not constitute proof of fraud.",
-        ParagraphStyle("Disclaimer", parent=small_style, fontSize=7, textColor=colors.grey)
+        _DISCLAIMER_STYLE,
     ))
 
     doc.build(elements)
+    output_path.write_bytes(buffer.getvalue())
     return output_path
+
+
+def generate_dossiers_pdf(
+    dossiers: list[Dossier],
+    output_dir: Path | None = None,
+    max_workers: int | None = None,
+) -> list[Path]:
+    """Generate PDF reports for many dossiers, one per worker process.
+
+    ReportLab layout is pure-Python and CPU-bound, so batches are fanned out
+    across processes (max_workers defaults to the CPU count). Returns the
+    output paths in the same order as dossiers.
+    """
+    if len(dossiers) <= 1 or max_workers == 1:
+        return [generate_dossier_pdf(d, output_dir) for d in dossiers]
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        return list(ex.map(generate_dossier_pdf, dossiers, repeat(output_dir)))
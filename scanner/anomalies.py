@@ -2,16 +2,17 @@ import time
 from pathlib import Path
 
 import click
+import numpy as np
 import pandas as pd
 
-from data.loader import load_claims
+from data.loader import aggregate_claims, remember_provider_totals
 from data.models import RedFlag, RedFlagType, ScanResult
 
 # Thresholds — tune these based on real data
 # Volume: max plausible claims per provider per month
 MAX_CLAIMS_PER_MONTH = 1500
 REVENUE_ZSCORE_THRESHOLD = 3.0  # Standard deviations above mean
-SPIKE_MULTIPLIER = 5.0  # Monthly billing spike vs provider's own average
+SPIKE_MULTIPLIER = 5.0  # Monthly billing spike vs provider's own median month
 DOMINANCE_THRESHOLD = 0.70   # Top procedure >= 70% of total billing
 RATE_CV_THRESHOLD = 0.08     # Per-claim rate coefficient of variation < 8%
 CONSISTENCY_MIN_MONTHS = 3   # Minimum months of data to evaluate consistency
@@ -62,6 +63,10 @@ UPCODING_MIN_CLAIMS = 50         # Minimum E&M claims to evaluate
 # Flag types that map to a specific named scheme (vs general statistical outliers)
 SCHEME_FLAG_TYPES = {RedFlagType.NOS_CODE_CONCENTRATION, RedFlagType.UPCODING_TRAJECTORY}
 
+# Columns the detectors actually reference; everything else is left on disk
+MONTHLY_COLUMNS = ["npi", "service_month", "total_claims", "total_paid"]
+PROCEDURE_COLUMNS = ["npi", "procedure_code", "service_month", "total_claims", "total_paid"]
+
 
 def scan_all(
     filepath: Path,
@@ -84,59 +89,72 @@ def scan_all(
     if monthly_path and procedure_path:
         t0 = time.time()
         click.echo("Loading preprocessed summaries...")
-        monthly_df = pd.read_parquet(monthly_path, engine="pyarrow")
-        code_df = pd.read_parquet(procedure_path, engine="pyarrow")
+        monthly_df = pd.read_parquet(monthly_path, engine="pyarrow", columns=MONTHLY_COLUMNS)
+        # Code-level detectors only look at in-scope providers, so push the NPI
+        # filter into the read and let row-group statistics skip the rest.
+        code_filters = [("npi", "in", sorted(state_npis))] if state_npis else None
+        code_df = pd.read_parquet(procedure_path, engine="pyarrow", columns=PROCEDURE_COLUMNS,
+                                  filters=code_filters)
         click.echo(f"done ({time.time() - t0:.1f}s)")
     else:
         t0 = time.time()
-        click.echo("Loading raw dataset (consider running 'preprocess' first)...")
-        df = load_claims(filepath)
-        click.echo(f"done ({time.time() - t0:.1f}s)")
-        t0 = time.time()
-        click.echo("Aggregating monthly data...")
-        monthly_df = (
-            df.groupby(["npi", "service_month"], as_index=False)
-            .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
-        )
-        click.echo(f"done ({time.time() - t0:.1f}s)")
-        t0 = time.time()
-        click.echo("Aggregating procedure code data...")
-        code_df = (
-            df.groupby(["npi", "procedure_code", "service_month"], as_index=False)
-            .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
-        )
+        click.echo("Streaming raw dataset (consider running 'preprocess' first)...")
+        monthly_df, code_df = aggregate_claims(filepath)
         click.echo(f"done ({time.time() - t0:.1f}s)")
 
-    # Filter out providers with total paid below minimum threshold
-    provider_totals = (
-        monthly_df.groupby("npi", as_index=False)["total_paid"]
-        .sum()
-        .rename(columns={"total_paid": "total_paid_sum"})
+    # Dictionary-encode NPIs once: every detector groups, filters and joins on
+    # npi, and integer category codes hash and compare faster than strings.
+    # Both frames come from the same rows, so one NPI dictionary covers both.
+    npi_dtype = pd.CategoricalDtype(monthly_df["npi"].unique())
+    monthly_df["npi"] = monthly_df["npi"].astype(npi_dtype)
+    code_df["npi"] = code_df["npi"].astype(npi_dtype)
+    # HCPCS codes are low-cardinality (a few thousand distinct values across
+    # millions of rows), so the code-level group-bys hash category codes too.
+    code_df["procedure_code"] = code_df["procedure_code"].astype("category")
+
+    # Per-provider totals are computed once and shared by the minimum-paid filter
+    # and the monthly detectors (revenue outliers, billing spikes).
+    provider_stats = _provider_stats(monthly_df)
+    # Every provider's total, before any filtering, is exactly the peer group a
+    # dossier compares against; record it so build_dossier need not re-aggregate.
+    remember_provider_totals(
+        monthly_path if monthly_path and procedure_path else filepath,
+        np.sort(provider_stats["total_paid_sum"].to_numpy(dtype=float)),
     )
-    qualifying_npis = (
-        provider_totals[provider_totals["total_paid_sum"] >= MIN_TOTAL_PAID]["npi"].tolist()
-    )
-    excluded = len(provider_totals) - len(qualifying_npis)
-    monthly_df = monthly_df[monthly_df["npi"].isin(qualifying_npis)].copy()
+
+    # Filter out providers with total paid below minimum threshold
+    provider_count = len(provider_stats)
+    provider_stats = provider_stats[provider_stats["total_paid_sum"] >= MIN_TOTAL_PAID]
+    excluded = provider_count - len(provider_stats)
+    # Broadcast the per-provider decision back to rows by category code: a
+    # boolean lookup table gathered with the code arrays, no hash probe per row.
+    # The extra trailing False catches code -1 (an NPI outside the dictionary).
+    qualifies = np.zeros(len(npi_dtype.categories) + 1, dtype=bool)
+    qualifies[provider_stats["npi"].cat.codes.to_numpy()] = True
+    monthly_df = monthly_df[qualifies[monthly_df["npi"].cat.codes.to_numpy()]]
     if code_df is not None:
-        code_df = code_df[code_df["npi"].isin(qualifying_npis)].copy()
-    click.echo(f"Filtered to {len(qualifying_npis):,} providers with >=${MIN_TOTAL_PAID:,} total paid "
+        code_df = code_df[qualifies[code_df["npi"].cat.codes.to_numpy()]]
+    click.echo(f"Filtered to {len(provider_stats):,} providers with >=${MIN_TOTAL_PAID:,} total paid "
                f"({excluded:,} excluded)")
 
     # national_monthly_df is used as the baseline for revenue-outlier z-scores so
     # that state providers are compared against all national peers, not just peers
     # within the same state.
     national_monthly_df = monthly_df
+    national_stats = provider_stats
 
     if state_npis is not None:
         act_monthly = monthly_df[monthly_df["npi"].isin(state_npis)].copy()
+        act_stats = provider_stats[provider_stats["npi"].isin(state_npis)]
         if code_df is not None:
             code_df = code_df[code_df["npi"].isin(state_npis)].copy()
         click.echo(f"Filtered to {act_monthly['npi'].nunique():,} providers in state scope")
     else:
         act_monthly = monthly_df
+        act_stats = provider_stats
 
-    num_detectors = 4 if code_df is None else 6
+    # Per-(provider, procedure) totals shared by the code-level detectors
+    proc_totals = _procedure_totals(code_df) if code_df is not None else None
 
     # Attempt to load NPPES entity types so the volume detector can skip
     # Type 2 (organisational) providers.  The NPPES zip is optional — if absent
@@ -155,89 +173,98 @@ def scan_all(
 
     click.echo("Running anomaly detection...")
 
-    # --- Volume impossibility (fixed threshold — safe on filtered data) ---
-    t0 = time.time()
-    click.echo(f"  [1/{num_detectors}] Volume impossibility detector...")
-    volume_flags = _detect_volume_impossibility(act_monthly, org_npis=org_npis, code_df=code_df)
-    click.echo(f"  done ({time.time() - t0:.1f}s, {len(volume_flags):,} flagged)")
-
-    # --- Revenue outliers (national baseline, state-filtered output) ---
-    t0 = time.time()
-    click.echo(f"  [2/{num_detectors}] Revenue outlier detector...")
-    revenue_flags = _detect_revenue_outliers(national_monthly_df, state_npis=state_npis)
-    click.echo(f"  done ({time.time() - t0:.1f}s, {len(revenue_flags):,} flagged)")
-
-    # --- Billing spikes (provider-relative — safe on filtered data) ---
-    t0 = time.time()
-    click.echo(f"  [3/{num_detectors}] Billing spike detector...")
-    spike_flags = _detect_billing_spikes(act_monthly)
-    click.echo(f"  done ({time.time() - t0:.1f}s, {len(spike_flags):,} flagged)")
-
-    # --- Suspicious consistency (procedure dominance + rate uniformity) ---
-    t0 = time.time()
-    click.echo(f"  [4/{num_detectors}] Suspicious consistency detector...")
-    consistency_flags = _detect_suspicious_consistency(code_df) if code_df is not None else {}
-    click.echo(f"  done ({time.time() - t0:.1f}s, {len(consistency_flags):,} flagged)")
-
-    # --- Scheme-specific detectors (require raw code-level data) ---
+    detectors = [
+        # Volume impossibility (fixed threshold — safe on filtered data)
+        ("Volume impossibility", _detect_volume_impossibility,
+         (act_monthly,), {"org_npis": org_npis, "code_df": code_df, "procedure_totals": proc_totals}),
+        # Revenue outliers (national baseline, state-filtered output)
+        ("Revenue outlier", _detect_revenue_outliers,
+         (national_monthly_df,), {"state_npis": state_npis, "provider_stats": national_stats}),
+        # Billing spikes (provider-relative — safe on filtered data)
+        ("Billing spike", _detect_billing_spikes, (act_monthly,), {"provider_stats": act_stats}),
+    ]
     if code_df is not None:
+        detectors += [
+            # Suspicious consistency (procedure dominance + rate uniformity)
+            ("Suspicious consistency", _detect_suspicious_consistency,
+             (code_df,), {"procedure_totals": proc_totals}),
+            # Scheme-specific detectors (require raw code-level data)
+            ("NOS concentration", _detect_nos_concentration,
+             (code_df,), {"procedure_totals": proc_totals}),
+            ("Upcoding trajectory", _detect_upcoding_trajectory, (code_df,), {}),
+        ]
+
+    detector_results: list[dict[str, list[RedFlag]]] = []
+    for i, (name, fn, args, kwargs) in enumerate(detectors, start=1):
         t0 = time.time()
-        click.echo(f"  [5/{num_detectors}] NOS concentration detector...")
-        nos_flags = _detect_nos_concentration(code_df)
-        click.echo(f"  done ({time.time() - t0:.1f}s, {len(nos_flags):,} flagged)")
+        click.echo(f"  [{i}/{len(detectors)}] {name} detector...")
+        detector_flags = fn(*args, **kwargs)
+        click.echo(f"  done ({time.time() - t0:.1f}s, {len(detector_flags):,} flagged)")
+        detector_results.append(detector_flags)
 
-        t0 = time.time()
-        click.echo(f"  [6/{num_detectors}] Upcoding trajectory detector...")
-        upcoding_flags = _detect_upcoding_trajectory(code_df)
-        click.echo(f"  done ({time.time() - t0:.1f}s, {len(upcoding_flags):,} flagged)")
-    else:
-        nos_flags = {}
-        upcoding_flags = {}
-
-    # Merge all flags by NPI
+    # Merge all flags by NPI in one pass over each detector's output (no
+    # intermediate key sets, no per-NPI lookups into every detector dict)
     t0 = time.time()
-    all_npis = (set(volume_flags) | set(revenue_flags) | set(spike_flags)
-                | set(consistency_flags) | set(nos_flags) | set(upcoding_flags))
+    merged: dict[str, list[RedFlag]] = {}
+    for detector_flags in detector_results:
+        for npi, npi_flags in detector_flags.items():
+            merged.setdefault(npi, []).extend(npi_flags)
 
     results = []
-    for npi in all_npis:
-        flags = []
-        flags.extend(volume_flags.get(npi, []))
-        flags.extend(revenue_flags.get(npi, []))
-        flags.extend(spike_flags.get(npi, []))
-        flags.extend(consistency_flags.get(npi, []))
-        flags.extend(nos_flags.get(npi, []))
-        flags.extend(upcoding_flags.get(npi, []))
-
+    for npi, flags in merged.items():
         if not flags:
             continue
 
         # Scoring weights scheme-specific flags (legally actionable patterns)
         # more heavily than general statistical outliers.
         max_severity = max(f.severity for f in flags)
-        distinct_types = len({f.flag_type for f in flags})
-        scheme_types = len({f.flag_type for f in flags if f.flag_type in SCHEME_FLAG_TYPES})
+        flag_types = {f.flag_type for f in flags}
+        distinct_types = len(flag_types)
+        scheme_types = len(flag_types & SCHEME_FLAG_TYPES)
         overall_score = min(1.0, max_severity * 0.4 + distinct_types * 0.15 + scheme_types * 0.2)
 
-        result = ScanResult(
+        # Only providers above threshold are materialized as ScanResults
+        if overall_score < threshold:
+            continue
+        results.append(ScanResult(
             npi=npi,
             provider_name="",
             overall_score=overall_score,
             red_flags=flags,
-        )
-        if result.overall_score >= threshold:
-            results.append(result)
+        ))
 
     results.sort(key=lambda r: r.overall_score, reverse=True)
-    click.echo(f"Scored and ranked {len(all_npis):,} providers ({time.time() - t0:.1f}s)")
+    click.echo(f"Scored and ranked {len(merged):,} providers ({time.time() - t0:.1f}s)")
     click.echo(f"Found {len(results):,} suspicious providers above threshold {threshold}")
     return results
 
 
+def _provider_stats(monthly_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-provider totals from the monthly summary, one row per NPI.
+
+    Columns: npi, total_paid_sum, total_claims_sum, month_count, median_paid.
+    """
+    return monthly_df.groupby("npi", as_index=False, observed=True).agg(
+        total_paid_sum=("total_paid", "sum"),
+        total_claims_sum=("total_claims", "sum"),
+        month_count=("total_paid", "count"),
+        median_paid=("total_paid", "median"),
+    )
+
+
+def _procedure_totals(code_df: pd.DataFrame) -> pd.DataFrame:
+    """Per-(provider, procedure) totals. Columns: npi, procedure_code, proc_paid, proc_claims."""
+    return code_df.groupby(["npi", "procedure_code"], as_index=False, observed=True).agg(
+        proc_paid=("total_paid", "sum"),
+        proc_claims=("total_claims", "sum"),
+    )
+
+
 def _detect_volume_impossibility(
     monthly_df: pd.DataFrame,
     org_npis: set[str] | None = None,
     code_df: pd.DataFrame | None = None,
+    procedure_totals: pd.DataFrame | None = None,
 ) -> dict[str, list[RedFlag]]:
     """Flag providers with impossibly high claim counts in a single month.
 
@@ -254,35 +281,37 @@ def _detect_volume_impossibility(
         # Find each provider's highest-volume procedure code across all months.
         # If that code is in ORG_BILLING_CODES the provider bills like a multi-staff
         # organisation and the solo-practitioner volume threshold doesn't apply.
-        code_totals = (
-            code_df.groupby(["npi", "procedure_code"], as_index=False)["total_claims"]
-            .sum()
-        )
-        code_totals["npi"] = code_totals["npi"].astype(str)
+        if procedure_totals is None:
+            procedure_totals = _procedure_totals(code_df)
         top_codes = (
-            code_totals.sort_values("total_claims", ascending=False)
+            procedure_totals[["npi", "procedure_code", "proc_claims"]]
+            .sort_values("proc_claims", ascending=False)
             .drop_duplicates(subset="npi", keep="first")
             .set_index("npi")["procedure_code"]
         )
         excluded |= set(top_codes[top_codes.isin(ORG_BILLING_CODES)].index)
 
     if excluded:
-        scan_df = monthly_df[~monthly_df["npi"].astype(str).isin(excluded)]
+        scan_df = monthly_df[~monthly_df["npi"].isin(excluded)]
     else:
         scan_df = monthly_df
 
-    flagged = scan_df[scan_df["total_claims"] > MAX_CLAIMS_PER_MONTH]
+    # Summaries are only clustered by NPI, so order each provider's flags by month
+    flagged = scan_df[scan_df["total_claims"] > MAX_CLAIMS_PER_MONTH].sort_values("service_month", kind="stable")
+    severities = (flagged["total_claims"] / (MAX_CLAIMS_PER_MONTH * 3)).clip(upper=1.0)
 
     flags: dict[str, list[RedFlag]] = {}
-    for _, row in flagged.iterrows():
-        npi = str(row["npi"])
-        count = row["total_claims"]
-        severity = min(1.0, count / (MAX_CLAIMS_PER_MONTH * 3))
+    for npi, month, count, severity in zip(
+        flagged["npi"].tolist(),
+        flagged["service_month"].astype(str).tolist(),
+        flagged["total_claims"].tolist(),
+        severities.tolist(),
+    ):
         flag = RedFlag(
             flag_type=RedFlagType.VOLUME_IMPOSSIBILITY,
-            description=f"{count:,} claims in {row['service_month']} (max plausible: {MAX_CLAIMS_PER_MONTH:,})",
+            description=f"{count:,} claims in {month} (max plausible: {MAX_CLAIMS_PER_MONTH:,})",
             severity=severity,
-            evidence={"month": str(row["service_month"]), "claims": count},
+            evidence={"month": month, "claims": count},
         )
         flags.setdefault(npi, []).append(flag)
 
@@ -292,6 +321,7 @@ def _detect_volume_impossibility(
 def _detect_revenue_outliers(
     monthly_df: pd.DataFrame,
     state_npis: set[str] | None = None,
+    provider_stats: pd.DataFrame | None = None,
 ) -> dict[str, list[RedFlag]]:
     """Flag providers whose revenue per claim is far above peers.
 
@@ -301,12 +331,13 @@ def _detect_revenue_outliers(
     When state_npis is provided, the national baseline (median/MAD) is still
     computed from the full monthly_df, but flags are only emitted for NPIs that
     appear in state_npis.
+
+    provider_stats (from _provider_stats) may be passed to reuse totals that
+    scan_all has already computed.
     """
-    provider_totals = (
-        monthly_df.groupby("npi", as_index=False)
-        .agg(total_paid_sum=("total_paid", "sum"), total_claims_sum=("total_claims", "sum"))
-    )
-    provider_totals = provider_totals[provider_totals["total_claims_sum"] > 0].copy()
+    if provider_stats is None:
+        provider_stats = _provider_stats(monthly_df)
+    provider_totals = provider_stats[provider_stats["total_claims_sum"] > 0].copy()
     provider_totals["paid_per_claim"] = (
         provider_totals["total_paid_sum"] / provider_totals["total_claims_sum"]
     )
@@ -314,107 +345,142 @@ def _detect_revenue_outliers(
     if provider_totals.empty:
         return {}
 
-    median_val = provider_totals["paid_per_claim"].median()
+    # Both medians and the deviations run on one plain float array
+    paid_per_claim = provider_totals["paid_per_claim"].to_numpy(dtype=float, na_value=np.nan)
+    median_val = float(np.nanmedian(paid_per_claim))
+    deviations = paid_per_claim - median_val
     # MAD = median of absolute deviations from the median
-    mad_val = (provider_totals["paid_per_claim"] - median_val).abs().median()
+    mad_val = float(np.nanmedian(np.abs(deviations)))
 
-    if pd.isna(mad_val) or mad_val == 0:
+    if np.isnan(mad_val) or mad_val == 0:
         return {}
 
     # Scale MAD to be comparable to std dev for normal distributions
     # (1.4826 is the consistency constant for normal distributions)
     scaled_mad = mad_val * 1.4826
 
+    provider_totals["zscore"] = deviations / scaled_mad
+    outliers = provider_totals[provider_totals["zscore"] > REVENUE_ZSCORE_THRESHOLD]
+    if state_npis is not None:
+        outliers = outliers[outliers["npi"].isin(state_npis)]
+    severities = (outliers["zscore"] / 10.0).clip(upper=1.0)
+
     flags: dict[str, list[RedFlag]] = {}
-    for _, row in provider_totals.iterrows():
-        npi = str(row["npi"])
-        if state_npis is not None and npi not in state_npis:
-            continue
-        modified_zscore = (row["paid_per_claim"] - median_val) / scaled_mad
-        if modified_zscore > REVENUE_ZSCORE_THRESHOLD:
-            severity = min(1.0, modified_zscore / 10.0)
-            flag = RedFlag(
-                flag_type=RedFlagType.REVENUE_OUTLIER,
-                description=(
-                    f"Revenue per claim ${row['paid_per_claim']:,.2f} "
-                    f"({modified_zscore:.1f} MADs above median ${median_val:,.2f}/claim)"
-                ),
-                severity=severity,
-                evidence={
-                    "paid_per_claim": round(row["paid_per_claim"], 2),
-                    "total_paid": row["total_paid_sum"],
-                    "total_claims": row["total_claims_sum"],
-                    "modified_zscore": round(modified_zscore, 2),
-                },
-            )
-            flags.setdefault(npi, []).append(flag)
+    for npi, paid_per_claim, total_paid, total_claims, modified_zscore, severity in zip(
+        outliers["npi"].tolist(),
+        outliers["paid_per_claim"].tolist(),
+        outliers["total_paid_sum"].tolist(),
+        outliers["total_claims_sum"].tolist(),
+        outliers["zscore"].tolist(),
+        severities.tolist(),
+    ):
+        flag = RedFlag(
+            flag_type=RedFlagType.REVENUE_OUTLIER,
+            description=(
+                f"Revenue per claim ${paid_per_claim:,.2f} "
+                f"({modified_zscore:.1f} MADs above median ${median_val:,.2f}/claim)"
+            ),
+            severity=severity,
+            evidence={
+                "paid_per_claim": round(paid_per_claim, 2),
+                "total_paid": total_paid,
+                "total_claims": total_claims,
+                "modified_zscore": round(modified_zscore, 2),
+            },
+        )
+        flags.setdefault(npi, []).append(flag)
 
     return flags
 
 
-def _detect_billing_spikes(monthly_df: pd.DataFrame) -> dict[str, list[RedFlag]]:
+def _detect_billing_spikes(
+    monthly_df: pd.DataFrame,
+    provider_stats: pd.DataFrame | None = None,
+) -> dict[str, list[RedFlag]]:
     """Flag providers with sudden monthly billing spikes vs their own history.
 
+    The baseline is the provider's median month rather than the mean, so the
+    spike itself cannot inflate its own baseline and dilute the ratio.
+
     Scale fix: replaced O(N²) Python loop (250K providers × full-frame boolean mask over
-    20M rows) with a single groupby aggregate + merge. O(N) at national scale.
+    20M rows) with a single groupby aggregate. O(N) at national scale.
     """
-    # Compute per-provider month count and mean in one pass, then merge back
-    stats = (
-        monthly_df.groupby("npi", as_index=False)
-        .agg(_month_count=("total_paid", "count"), _avg=("total_paid", "mean"))
-    )
-    stats = stats[(stats["_month_count"] >= 3) & (stats["_avg"] > 0)]
+    # Per-provider month count and median (shared with scan_all when passed in)
+    if provider_stats is None:
+        provider_stats = _provider_stats(monthly_df)
+    stats = provider_stats[(provider_stats["month_count"] >= 3) & (provider_stats["median_paid"] > 0)]
     if stats.empty:
         return {}
 
-    df = monthly_df.merge(stats[["npi", "_avg"]], on="npi", how="inner")
-    df["_ratio"] = df["total_paid"] / df["_avg"]
-    spikes = df[df["_ratio"] > SPIKE_MULTIPLIER]
+    # Broadcast each provider's baseline onto its rows with a hash lookup (a
+    # window-style pass) rather than merging and copying the whole frame.
+    # Providers without enough history map to NaN and never compare as spikes.
+    # On a categorical npi, map() returns a Categorical when the mapped values
+    # are all distinct, so force the baseline back to float before dividing.
+    baseline = monthly_df["npi"].map(stats.set_index("npi")["median_paid"]).astype("float64")
+    ratio = monthly_df["total_paid"] / baseline
+    mask = (ratio > SPIKE_MULTIPLIER).fillna(False).to_numpy(dtype=bool)
+    # Summaries are only clustered by NPI, so order each provider's flags by month
+    spikes = monthly_df.loc[mask, ["npi", "service_month", "total_paid"]].assign(
+        _baseline=baseline[mask], _ratio=ratio[mask],
+    ).sort_values("service_month", kind="stable")
+    severities = (spikes["_ratio"] / 10.0).clip(upper=1.0)
 
     flags: dict[str, list[RedFlag]] = {}
-    for _, row in spikes.iterrows():
-        npi = str(row["npi"])
-        ratio = row["_ratio"]
-        avg = row["_avg"]
-        severity = min(1.0, ratio / 10.0)
+    for npi, month, amount, median, ratio, severity in zip(
+        spikes["npi"].tolist(),
+        spikes["service_month"].astype(str).tolist(),
+        spikes["total_paid"].tolist(),
+        spikes["_baseline"].tolist(),
+        spikes["_ratio"].tolist(),
+        severities.tolist(),
+    ):
         flag = RedFlag(
             flag_type=RedFlagType.BILLING_SPIKE,
-            description=f"Monthly paid ${row['total_paid']:,.2f} in {row['service_month']} is {ratio:.1f}x their average ${avg:,.2f}",
+            description=f"Monthly paid ${amount:,.2f} in {month} is {ratio:.1f}x their median ${median:,.2f}",
             severity=severity,
-            evidence={"month": str(row["service_month"]), "amount": row["total_paid"], "ratio": round(ratio, 2)},
+            evidence={"month": month, "amount": amount, "ratio": round(ratio, 2)},
         )
         flags.setdefault(npi, []).append(flag)
 
     return flags
 
 
-def _detect_nos_concentration(code_df: pd.DataFrame) -> dict[str, list[RedFlag]]:
+def _detect_nos_concentration(
+    code_df: pd.DataFrame,
+    procedure_totals: pd.DataFrame | None = None,
+) -> dict[str, list[RedFlag]]:
     """Flag providers where NOS/miscellaneous codes make up a large share of billing.
 
     NOS codes lack specificity and are a classic vehicle for DME and supply fraud —
     they obscure what was actually billed and are harder to audit than named items.
     """
+    if procedure_totals is None:
+        procedure_totals = _procedure_totals(code_df)
     provider_totals = (
-        code_df.groupby("npi", as_index=False)["total_paid"]
+        procedure_totals.groupby("npi", as_index=False, observed=True)["proc_paid"]
         .sum()
-        .rename(columns={"total_paid": "total_paid_all"})
+        .rename(columns={"proc_paid": "total_paid_all"})
     )
     nos_totals = (
-        code_df[code_df["procedure_code"].isin(NOS_CODES)]
-        .groupby("npi", as_index=False)["total_paid"]
+        procedure_totals[procedure_totals["procedure_code"].isin(NOS_CODES)]
+        .groupby("npi", as_index=False, observed=True)["proc_paid"]
         .sum()
-        .rename(columns={"total_paid": "nos_paid"})
+        .rename(columns={"proc_paid": "nos_paid"})
     )
     merged = provider_totals.merge(nos_totals, on="npi", how="inner")
     merged["nos_ratio"] = merged["nos_paid"] / merged["total_paid_all"]
     merged = merged[merged["nos_ratio"] >= NOS_CONCENTRATION_THRESHOLD]
+    severities = (merged["nos_ratio"] / 0.5).clip(upper=1.0)  # 50%+ NOS = max severity
 
     flags: dict[str, list[RedFlag]] = {}
-    for _, row in merged.iterrows():
-        npi = str(row["npi"])
-        ratio = row["nos_ratio"]
-        nos_paid = row["nos_paid"]
-        severity = min(1.0, ratio / 0.5)  # 50%+ NOS = max severity
+    for npi, ratio, nos_paid, total_paid, severity in zip(
+        merged["npi"].tolist(),
+        merged["nos_ratio"].tolist(),
+        merged["nos_paid"].tolist(),
+        merged["total_paid_all"].tolist(),
+        severities.tolist(),
+    ):
         flag = RedFlag(
             flag_type=RedFlagType.NOS_CODE_CONCENTRATION,
             description=(
@@ -425,7 +491,7 @@ def _detect_nos_concentration(code_df: pd.DataFrame) -> dict[str, list[RedFlag]]
             evidence={
                 "nos_ratio": round(ratio, 3),
                 "nos_paid": round(nos_paid, 2),
-                "total_paid": round(row["total_paid_all"], 2),
+                "total_paid": round(total_paid, 2),
             },
         )
         flags.setdefault(npi, []).append(flag)
@@ -440,64 +506,93 @@ def _detect_upcoding_trajectory(code_df: pd.DataFrame) -> dict[str, list[RedFlag
     billing history vs the second half. A significant upward shift (with no change in
     patient volume) is a signature of deliberate upcoding rather than clinical change.
     """
-    em_df = code_df[code_df["procedure_code"].isin(set(EM_CODES.keys()))].copy()
+    em_df = code_df[code_df["procedure_code"].isin(set(EM_CODES.keys()))]
 
     if em_df.empty:
         return {}
 
-    em_df["code_level"] = em_df["procedure_code"].map(lambda c: EM_CODES.get(c, 0)).astype(int)
+    # Per (provider, month) E&M claims, paid and claim-weighted code level.
+    # npi_order keeps providers in first-appearance order for the output.
+    monthly = (
+        em_df.assign(
+            weighted=em_df["procedure_code"].map(EM_CODES).astype(int) * em_df["total_claims"],
+            npi_order=pd.factorize(em_df["npi"])[0],
+        )
+        .groupby(["npi_order", "npi", "service_month"], as_index=False, observed=True)
+        .agg(claims=("total_claims", "sum"), paid=("total_paid", "sum"), weighted=("weighted", "sum"))
+        .sort_values(["npi_order", "service_month"], kind="stable")
+    )
 
-    flags: dict[str, list[RedFlag]] = {}
-    for npi in em_df["npi"].unique():
-        provider_em = em_df[em_df["npi"] == npi].sort_values("service_month")
+    # Split each provider's months into an early and a late half (the late half
+    # gets the extra month when the count is odd) and sum each half
+    grp = monthly.groupby("npi_order", sort=False)
+    position = grp.cumcount()
+    month_count = grp["service_month"].transform("size")
+    late = position >= month_count // 2
+    monthly["early_claims"] = monthly["claims"].where(~late, 0)
+    monthly["early_weighted"] = monthly["weighted"].where(~late, 0)
+    monthly["late_claims"] = monthly["claims"].where(late, 0)
+    monthly["late_weighted"] = monthly["weighted"].where(late, 0)
+
+    providers = monthly.groupby("npi_order", sort=True).agg(
+        npi=("npi", "first"),
+        month_count=("service_month", "size"),
+        total_claims=("claims", "sum"),
+        total_paid=("paid", "sum"),
+        early_claims=("early_claims", "sum"),
+        early_weighted=("early_weighted", "sum"),
+        late_claims=("late_claims", "sum"),
+        late_weighted=("late_weighted", "sum"),
+    )
+    providers = providers[
+        (providers["total_claims"] >= UPCODING_MIN_CLAIMS) & (providers["month_count"] >= 6)
+    ]
 
-        total_claims = provider_em["total_claims"].sum()
-        if total_claims < UPCODING_MIN_CLAIMS:
-            continue
+    def half_avg(half: str) -> pd.Series:
+        """Claim-weighted average E&M level for one half (0 when it has no claims)."""
+        half_claims = providers[f"{half}_claims"]
+        return (providers[f"{half}_weighted"] / half_claims.where(half_claims > 0)).fillna(0.0)
 
-        months = sorted(provider_em["service_month"].unique())
-        if len(months) < 6:
-            continue
+    providers = providers.assign(early_avg=half_avg("early"), late_avg=half_avg("late"))
+    providers["shift"] = providers["late_avg"] - providers["early_avg"]
+    providers = providers[providers["shift"] >= UPCODING_SHIFT_THRESHOLD]
+    severities = (providers["shift"] / 1.5).clip(upper=1.0)
 
-        mid = len(months) // 2
-        early = provider_em[provider_em["service_month"].isin(months[:mid])]
-        late = provider_em[provider_em["service_month"].isin(months[mid:])]
-
-        def weighted_avg(df: pd.DataFrame) -> float:
-            total = df["total_claims"].sum()
-            if total == 0:
-                return 0.0
-            return float((df["code_level"] * df["total_claims"]).sum()) / total
-
-        early_avg = weighted_avg(early)
-        late_avg = weighted_avg(late)
-        shift = late_avg - early_avg
-
-        if shift >= UPCODING_SHIFT_THRESHOLD:
-            severity = min(1.0, shift / 1.5)
-            total_paid = float(provider_em["total_paid"].sum())
-            flag = RedFlag(
-                flag_type=RedFlagType.UPCODING_TRAJECTORY,
-                description=(
-                    f"E&M code level shifted +{shift:.2f} points over time "
-                    f"({early_avg:.2f} → {late_avg:.2f}) — systematic upgrade toward "
-                    f"higher-reimbursed codes across {int(total_claims):,} claims"
-                ),
-                severity=severity,
-                evidence={
-                    "early_avg_level": round(early_avg, 2),
-                    "late_avg_level": round(late_avg, 2),
-                    "shift": round(shift, 2),
-                    "total_em_claims": int(total_claims),
-                    "total_em_paid": round(total_paid, 2),
-                },
-            )
-            flags.setdefault(str(npi), []).append(flag)
+    flags: dict[str, list[RedFlag]] = {}
+    for npi, early, late_level, delta, total_claims, total_paid, severity in zip(
+        providers["npi"].tolist(),
+        providers["early_avg"].tolist(),
+        providers["late_avg"].tolist(),
+        providers["shift"].tolist(),
+        providers["total_claims"].tolist(),
+        providers["total_paid"].tolist(),
+        severities.tolist(),
+    ):
+        flag = RedFlag(
+            flag_type=RedFlagType.UPCODING_TRAJECTORY,
+            description=(
+                f"E&M code level shifted +{delta:.2f} points over time "
+                f"({early:.2f} → {late_level:.2f}) — systematic upgrade toward "
+                f"higher-reimbursed codes across {int(total_claims):,} claims"
+            ),
+            severity=severity,
+            evidence={
+                "early_avg_level": round(early, 2),
+                "late_avg_level": round(late_level, 2),
+                "shift": round(delta, 2),
+                "total_em_claims": int(total_claims),
+                "total_em_paid": round(float(total_paid), 2),
+            },
+        )
+        flags.setdefault(npi, []).append(flag)
 
     return flags
 
 
-def _detect_suspicious_consistency(code_df: pd.DataFrame) -> dict[str, list[RedFlag]]:
+def _detect_suspicious_consistency(
+    code_df: pd.DataFrame,
+    procedure_totals: pd.DataFrame | None = None,
+) -> dict[str, list[RedFlag]]:
     """Flag providers whose billing is dominated by one procedure billed at a
     suspiciously uniform per-claim rate — the signature of copy-paste or phantom billing.
 
@@ -509,37 +604,33 @@ def _detect_suspicious_consistency(code_df: pd.DataFrame) -> dict[str, list[RedF
     if code_df is None or code_df.empty:
         return {}
 
+    # Per (npi, procedure_code) totals — to find the dominant code
+    if procedure_totals is None:
+        procedure_totals = _procedure_totals(code_df)
+
     # Per-provider total paid
     provider_totals = (
-        code_df.groupby("npi", as_index=False)["total_paid"]
+        procedure_totals.groupby("npi", as_index=False, observed=True)["proc_paid"]
         .sum()
-        .rename(columns={"total_paid": "grand_total"})
+        .rename(columns={"proc_paid": "grand_total"})
     )
-
-    # Per (npi, procedure_code) totals — to find the dominant code
-    proc_totals = (
-        code_df.groupby(["npi", "procedure_code"], as_index=False)
-        .agg(proc_paid=("total_paid", "sum"), proc_claims=("total_claims", "sum"))
-    )
-    proc_totals = proc_totals.merge(provider_totals, on="npi")
+    proc_totals = procedure_totals.merge(provider_totals, on="npi")
     proc_totals["dominance"] = proc_totals["proc_paid"] / proc_totals["grand_total"]
 
-    # Keep only the single highest-revenue procedure per provider
-    dominant = (
-        proc_totals.sort_values("dominance", ascending=False)
-        .drop_duplicates(subset="npi", keep="first")
-    )
-    dominant = dominant[dominant["dominance"] >= DOMINANCE_THRESHOLD].copy()
-
-    if dominant.empty:
+    # Keep only the single highest-revenue procedure per provider. Filtering on
+    # the threshold first leaves few candidates, and a per-group idxmax picks
+    # the top one without a global sort over every (npi, procedure) pair.
+    candidates = proc_totals[proc_totals["dominance"] >= DOMINANCE_THRESHOLD]
+    if candidates.empty:
         return {}
+    dominant = candidates.loc[candidates.groupby("npi", observed=True)["dominance"].idxmax()]
 
     # Per-claim rate per (npi, procedure_code, month) — skip zero-claim rows
     monthly_rates = code_df[code_df["total_claims"] > 0].copy()
     monthly_rates["rate"] = monthly_rates["total_paid"] / monthly_rates["total_claims"]
 
     rate_stats = (
-        monthly_rates.groupby(["npi", "procedure_code"], as_index=False)
+        monthly_rates.groupby(["npi", "procedure_code"], as_index=False, observed=True)
         .agg(
             mean_rate=("rate", "mean"),
             std_rate=("rate", "std"),
@@ -556,25 +647,32 @@ def _detect_suspicious_consistency(code_df: pd.DataFrame) -> dict[str, list[RedF
         return {}
 
     flagged = dominant.merge(rate_stats, on=["npi", "procedure_code"])
+    severities = (flagged["dominance"] * (1.0 - flagged["cv"])).clip(upper=1.0)
 
     flags: dict[str, list[RedFlag]] = {}
-    for _, row in flagged.iterrows():
-        npi = str(row["npi"])
-        severity = min(1.0, row["dominance"] * (1.0 - row["cv"]))
+    for npi, code, dominance, mean_rate, cv, month_count, severity in zip(
+        flagged["npi"].tolist(),
+        flagged["procedure_code"].tolist(),
+        flagged["dominance"].tolist(),
+        flagged["mean_rate"].tolist(),
+        flagged["cv"].tolist(),
+        flagged["month_count"].tolist(),
+        severities.tolist(),
+    ):
         flag = RedFlag(
             flag_type=RedFlagType.SUSPICIOUS_CONSISTENCY,
             description=(
-                f"{row['dominance']:.0%} of billing is procedure {row['procedure_code']} "
-                f"at ${row['mean_rate']:,.2f}/claim with only {row['cv']:.1%} rate variation "
-                f"across {int(row['month_count'])} months — consistent with copy-paste billing"
+                f"{dominance:.0%} of billing is procedure {code} "
+                f"at ${mean_rate:,.2f}/claim with only {cv:.1%} rate variation "
+                f"across {int(month_count)} months — consistent with copy-paste billing"
             ),
             severity=severity,
             evidence={
-                "procedure_code": row["procedure_code"],
-                "dominance_ratio": round(row["dominance"], 3),
-                "mean_rate_per_claim": round(row["mean_rate"], 2),
-                "rate_cv": round(row["cv"], 4),
-                "months_observed": int(row["month_count"]),
+                "procedure_code": code,
+                "dominance_ratio": round(dominance, 3),
+                "mean_rate_per_claim": round(mean_rate, 2),
+                "rate_cv": round(cv, 4),
+                "months_observed": int(month_count),
             },
         )
         flags.setdefault(npi, []).append(flag)
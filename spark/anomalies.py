@@ -148,22 +148,22 @@ def detect_revenue_outliers(monthly_df: DataFrame) -> DataFrame:
 
 
 def detect_billing_spikes(monthly_df: DataFrame) -> DataFrame:
-    """Flag months where a provider's billing spikes vs their own historical average."""
+    """Flag months where a provider's billing spikes vs their own median month."""
     window = Window.partitionBy("npi")
 
-    with_avg = monthly_df.withColumn(
-        "provider_avg",
-        F.avg("total_paid").over(window),
+    with_median = monthly_df.withColumn(
+        "provider_median",
+        F.median("total_paid").over(window),
     ).withColumn(
         "row_count",
         F.count("*").over(window),
     )
 
     return (
-        with_avg
+        with_median
         .filter(F.col("row_count") >= 3)        # need history to detect spikes
-        .filter(F.col("provider_avg") > 0)
-        .withColumn("ratio", F.col("total_paid") / F.col("provider_avg"))
+        .filter(F.col("provider_median") > 0)
+        .withColumn("ratio", F.col("total_paid") / F.col("provider_median"))
         .filter(F.col("ratio") > SPIKE_MULTIPLIER)
         .withColumn("flag_type", F.lit(BILLING_SPIKE))
         .withColumn(
@@ -176,8 +176,8 @@ def detect_billing_spikes(monthly_df: DataFrame) -> DataFrame:
                 F.col("service_month").cast("string"),
                 F.lit(" is "),
                 F.format_number(F.col("ratio"), 1),
-                F.lit("x their average $"),
-                F.format_number(F.col("provider_avg"), 2),
+                F.lit("x their median $"),
+                F.format_number(F.col("provider_median"), 2),
             ),
         )
         .withColumn(
@@ -1,13 +1,17 @@
 """Shared fixtures: synthetic Medicaid claims CSV matching HHS schema."""
 
-import csv
+import itertools
+from collections.abc import Iterator
 from datetime import date
 from pathlib import Path
 
 import pandas as pd
 import pytest
 
+import data.fetch as fetch
 from data.loader import load_claims
+from data.models import Dossier
+from profiler.dossier import build_dossier
 
 
 # Provider NPIs
@@ -26,20 +30,17 @@ def _month(year: int, month: int) -> str:
     return date(year, month, 1).isoformat()
 
 
-def _generate_rows() -> list[dict]:
-    """Build synthetic rows matching HHS Medicaid Provider Spending schema."""
-    rows = []
+def _generate_rows() -> dict[str, list]:
+    """Build synthetic columns matching HHS Medicaid Provider Spending schema."""
+    npis, hcpcs_codes, months, bens, clms, paids = [], [], [], [], [], []
 
     def add(npi, hcpcs, month, beneficiaries, claims, paid):
-        rows.append({
-            "BILLING_PROVIDER_NPI_NUM": npi,
-            "SERVICING_PROVIDER_NPI_NUM": npi,
-            "HCPCS_CODE": hcpcs,
-            "CLAIM_FROM_MONTH": month,
-            "TOTAL_UNIQUE_BENEFICIARIES": beneficiaries,
-            "TOTAL_CLAIMS": claims,
-            "TOTAL_PAID": f"{paid:.2f}",
-        })
+        npis.append(npi)
+        hcpcs_codes.append(hcpcs)
+        months.append(month)
+        bens.append(beneficiaries)
+        clms.append(claims)
+        paids.append(f"{paid:.2f}")
 
     # --- Clean provider: normal billing across 6 months ---
     for m in range(1, 7):
@@ -71,42 +72,81 @@ def _generate_rows() -> list[dict]:
 
     # --- Filler providers: 20 normal providers so z-score stats are meaningful ---
     # Each filler: 6 months * ~20000-38000 = 120000-228000 (above MIN_TOTAL_PAID)
-    for p in range(20):
-        filler_npi = f"99000000{p:02d}"
-        for m in range(1, 7):
-            add(filler_npi, "99213", _month(2024, m), 10, 20, 20000 + (p % 10) * 2000)
-
-    return rows
+    # Every filler row has the same shape, so the columns are extended in bulk
+    fillers = list(itertools.product(range(20), range(1, 7)))
+    npis.extend(f"99000000{p:02d}" for p, _ in fillers)
+    hcpcs_codes.extend(["99213"] * len(fillers))
+    months.extend(_month(2024, m) for _, m in fillers)
+    bens.extend([10] * len(fillers))
+    clms.extend([20] * len(fillers))
+    paids.extend(f"{20000 + (p % 10) * 2000:.2f}" for p, _ in fillers)
+
+    return {
+        "BILLING_PROVIDER_NPI_NUM": npis,
+        "SERVICING_PROVIDER_NPI_NUM": npis,
+        "HCPCS_CODE": hcpcs_codes,
+        "CLAIM_FROM_MONTH": months,
+        "TOTAL_UNIQUE_BENEFICIARIES": bens,
+        "TOTAL_CLAIMS": clms,
+        "TOTAL_PAID": paids,
+    }
+
+
+@pytest.fixture(scope="session", autouse=True)
+def nppes_cache_file(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Path]:
+    """Keep NPPES lookups made by tests out of the repo's data directories."""
+    path = tmp_path_factory.mktemp("nppes") / "nppes_cache.sqlite"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(fetch, "NPPES_CACHE_FILE", path)
+        yield path
+
+
+# The synthetic data never changes and nothing mutates it, so it is written and
+# aggregated once per test session rather than once per test. Under pytest-xdist
+# each worker has its own session and basetemp, so workers never share files.
+@pytest.fixture(scope="session")
+def sample_csv(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Write synthetic claims CSV and return its path."""
+    filepath = tmp_path_factory.mktemp("claims") / "test_claims.csv"
+    pd.DataFrame(_generate_rows()).to_csv(filepath, index=False)
+    return filepath
 
 
-@pytest.fixture
-def sample_csv(tmp_path: Path) -> Path:
-    """Write synthetic claims CSV and return its path."""
-    filepath = tmp_path / "test_claims.csv"
-    rows = _generate_rows()
-    fieldnames = list(rows[0].keys())
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+@pytest.fixture(scope="session")
+def sample_parquet(sample_csv: Path, tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """The synthetic claims as Parquet with HHS column names and int64 NPIs, like the real file."""
+    # Kept out of sample_csv's directory so the CSV-to-Parquet conversion tests
+    # still start from a directory containing only the CSV.
+    filepath = tmp_path_factory.mktemp("parquet") / "test_claims.parquet"
+    pd.read_csv(sample_csv).to_parquet(filepath, index=False)
     return filepath
 
 
-@pytest.fixture
-def monthly_df(sample_csv: Path) -> pd.DataFrame:
+@pytest.fixture(scope="session")
+def sample_claims(sample_csv: Path) -> pd.DataFrame:
+    """The synthetic claims as load_claims returns them (read-only; don't mutate)."""
+    return load_claims(sample_csv)
+
+
+@pytest.fixture(scope="session")
+def monthly_df(sample_claims: pd.DataFrame) -> pd.DataFrame:
     """Provider+month aggregation matching the preprocessed monthly file."""
-    df = load_claims(sample_csv)
     return (
-        df.groupby(["npi", "service_month"], as_index=False)
+        sample_claims.groupby(["npi", "service_month"], as_index=False)
         .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
     )
 
 
-@pytest.fixture
-def procedure_df(sample_csv: Path) -> pd.DataFrame:
+@pytest.fixture(scope="session")
+def procedure_df(sample_claims: pd.DataFrame) -> pd.DataFrame:
     """Provider+procedure+month aggregation matching the preprocessed procedure file."""
-    df = load_claims(sample_csv)
     return (
-        df.groupby(["npi", "procedure_code", "service_month"], as_index=False)
+        sample_claims.groupby(["npi", "procedure_code", "service_month"], as_index=False)
         .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
     )
+
+
+@pytest.fixture(scope="session")
+def clean_dossier(sample_csv: Path) -> Dossier:
+    """Dossier for CLEAN_NPI, built once for the read-only dossier assertions."""
+    return build_dossier(sample_csv, CLEAN_NPI)
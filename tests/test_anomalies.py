@@ -10,6 +10,7 @@ from scanner.anomalies import (
     _detect_revenue_outliers,
     _detect_billing_spikes,
     _detect_suspicious_consistency,
+    _detect_upcoding_trajectory,
     scan_all,
 )
 from tests.conftest import (
@@ -88,6 +89,19 @@ def test_billing_spike_skips_clean_provider(monthly_df: pd.DataFrame):
     assert CLEAN_NPI not in flags
 
 
+def test_monthly_flags_are_in_month_order():
+    """Summaries are only clustered by NPI; flags still list months chronologically."""
+    monthly = pd.DataFrame({
+        "npi": [VOLUME_NPI] * 8,
+        "service_month": [f"2024-{m:02d}-01" for m in (6, 4, 2, 8, 7, 5, 3, 1)],
+        "total_claims": [5_000, 5_000, 5_000, 10, 10, 10, 10, 10],
+        "total_paid": [500_000.0] * 3 + [1_000.0] * 5,
+    })
+    for detect in (_detect_volume_impossibility, _detect_billing_spikes):
+        flags = detect(monthly)
+        assert [f.evidence["month"] for f in flags[VOLUME_NPI]] == ["2024-02-01", "2024-04-01", "2024-06-01"]
+
+
 def test_suspicious_consistency_flags_consistency_provider(procedure_df: pd.DataFrame):
     flags = _detect_suspicious_consistency(procedure_df)
     assert CONSISTENCY_NPI in flags
@@ -103,7 +117,7 @@ def test_scan_all_returns_sorted_results(sample_csv: Path):
     results = scan_all(sample_csv, threshold=0.0)
     assert len(results) > 0
     scores = [r.overall_score for r in results]
-    assert scores == sorted(scores, reverse=True)
+    assert all(a >= b for a, b in zip(scores, scores[1:]))
 
 
 def test_scan_all_threshold_filters(sample_csv: Path):
@@ -116,5 +130,102 @@ def test_scan_all_threshold_filters(sample_csv: Path):
 
 def test_clean_provider_not_in_scan_results(sample_csv: Path):
     results = scan_all(sample_csv, threshold=0.0)
-    npis = [r.npi for r in results]
-    assert CLEAN_NPI not in npis
+    assert all(r.npi != CLEAN_NPI for r in results)
+
+
+def test_scan_all_preprocessed_state_scope_matches_raw(sample_csv: Path, tmp_path: Path, monkeypatch):
+    """Scoped scans over the preprocessed summaries match the raw-file path."""
+    import data.loader as loader
+
+    monkeypatch.setattr(loader, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(loader, "PROVIDER_MONTHLY_FILE", tmp_path / "provider_monthly.parquet")
+    monkeypatch.setattr(loader, "PROVIDER_PROCEDURE_FILE", tmp_path / "provider_procedure.parquet")
+    monthly_path, procedure_path = loader.preprocess(sample_csv)
+
+    for npi in (VOLUME_NPI, CONSISTENCY_NPI):
+        raw = scan_all(sample_csv, threshold=0.0, state_npis={npi})
+        pre = scan_all(sample_csv, threshold=0.0, monthly_path=monthly_path,
+                       procedure_path=procedure_path, state_npis={npi})
+        assert [r.npi for r in pre] == [r.npi for r in raw] == [npi]
+        assert pre[0].flag_types == raw[0].flag_types
+
+
+def test_scan_all_drops_providers_below_min_total_paid(tmp_path: Path):
+    """A provider under MIN_TOTAL_PAID is excluded even if a detector would flag it."""
+    from tests.conftest import _generate_rows
+
+    columns = _generate_rows()
+    small_npi = "7000000007"
+    for key, value in {
+        "BILLING_PROVIDER_NPI_NUM": small_npi,
+        "SERVICING_PROVIDER_NPI_NUM": small_npi,
+        "HCPCS_CODE": "99213",
+        "CLAIM_FROM_MONTH": "2024-01-01",
+        "TOTAL_UNIQUE_BENEFICIARIES": 100,
+        "TOTAL_CLAIMS": 5000,
+        "TOTAL_PAID": "50000.00",
+    }.items():
+        columns[key] = columns[key] + [value]
+    filepath = tmp_path / "claims.csv"
+    pd.DataFrame(columns).to_csv(filepath, index=False)
+
+    npis = {r.npi for r in scan_all(filepath, threshold=0.0)}
+    assert small_npi not in npis
+    assert VOLUME_NPI in npis
+
+
+def test_upcoding_trajectory_flags_rising_em_levels():
+    """Shifting from 99213 to 99215 over six months is flagged; steady billing is not."""
+    rows = []
+    for m in range(1, 7):
+        month = f"2024-{m:02d}-01"
+        rows.append(("5000000005", "99213" if m <= 3 else "99215", month, 20, 2000.0))
+        rows.append((CLEAN_NPI, "99213", month, 20, 2000.0))
+    code_df = pd.DataFrame(
+        rows, columns=["npi", "procedure_code", "service_month", "total_claims", "total_paid"],
+    )
+
+    flags = _detect_upcoding_trajectory(code_df)
+    assert list(flags) == ["5000000005"]
+    evidence = flags["5000000005"][0].evidence
+    assert (evidence["early_avg_level"], evidence["late_avg_level"]) == (3.0, 5.0)
+    assert evidence["total_em_claims"] == 120
+
+
+def test_scan_all_handles_distinct_provider_medians(tmp_path: Path):
+    """Every provider having a different median month must not break the spike baseline."""
+    rows = []
+    for npi, base in (("1111111111", 20_000), ("2222222222", 30_000)):
+        for m in range(1, 7):
+            rows.append({
+                "BILLING_PROVIDER_NPI_NUM": npi,
+                "SERVICING_PROVIDER_NPI_NUM": npi,
+                "HCPCS_CODE": "99213",
+                "CLAIM_FROM_MONTH": f"2024-{m:02d}-01",
+                "TOTAL_UNIQUE_BENEFICIARIES": 5,
+                "TOTAL_CLAIMS": 10,
+                "TOTAL_PAID": base + m,
+            })
+    filepath = tmp_path / "claims.csv"
+    pd.DataFrame(rows).to_csv(filepath, index=False)
+
+    results = scan_all(filepath, threshold=0.0)
+    assert all(f.flag_type != RedFlagType.BILLING_SPIKE for r in results for f in r.red_flags)
+
+
+def test_scan_all_counts_spend_without_procedure_code(tmp_path: Path):
+    """Raw rows missing HCPCS_CODE still count toward provider totals."""
+    import data.loader as loader
+
+    filepath = tmp_path / "claims.csv"
+    pd.DataFrame({
+        "BILLING_PROVIDER_NPI_NUM": [CLEAN_NPI] * 3,
+        "HCPCS_CODE": ["99213", "99214", None],
+        "CLAIM_FROM_MONTH": ["2024-01-01"] * 3,
+        "TOTAL_CLAIMS": [10, 10, 10],
+        "TOTAL_PAID": [100.0, 100.0, 100.0],
+    }).to_csv(filepath, index=False)
+
+    scan_all(filepath, threshold=0.0)
+    assert loader.cached_provider_totals(filepath).tolist() == [300.0]
+
@@ -7,32 +7,57 @@ from profiler.dossier import build_dossier
 from tests.conftest import CLEAN_NPI, VOLUME_NPI
 
 
-def test_build_dossier_returns_dossier(sample_csv: Path):
-    dossier = build_dossier(sample_csv, CLEAN_NPI)
-    assert isinstance(dossier, Dossier)
-    assert dossier.provider.npi == CLEAN_NPI
+def test_build_dossier_returns_dossier(clean_dossier: Dossier):
+    assert isinstance(clean_dossier, Dossier)
+    assert clean_dossier.provider.npi == CLEAN_NPI
 
 
-def test_dossier_has_claims_summary(sample_csv: Path):
-    dossier = build_dossier(sample_csv, CLEAN_NPI)
+def test_dossier_has_claims_summary(clean_dossier: Dossier):
     # Clean provider: 6 months * (30 + 15) = 270 total claims
-    assert dossier.claims_summary["total_claims"] == 270
-    assert "total_paid" in dossier.claims_summary
+    assert clean_dossier.claims_summary["total_claims"] == 270
+    assert "total_paid" in clean_dossier.claims_summary
 
 
-def test_dossier_has_peer_comparison(sample_csv: Path):
-    dossier = build_dossier(sample_csv, CLEAN_NPI)
-    assert "peer_count" in dossier.peer_comparison
+def test_dossier_has_peer_comparison(clean_dossier: Dossier):
+    assert "peer_count" in clean_dossier.peer_comparison
 
 
-def test_dossier_has_timeline(sample_csv: Path):
-    dossier = build_dossier(sample_csv, CLEAN_NPI)
-    assert len(dossier.timeline) > 0
-    assert "month" in dossier.timeline[0]
-    assert "total_paid" in dossier.timeline[0]
+def test_dossier_has_timeline(clean_dossier: Dossier):
+    assert len(clean_dossier.timeline) > 0
+    assert "month" in clean_dossier.timeline[0]
+    assert "total_paid" in clean_dossier.timeline[0]
 
 
 def test_dossier_with_scan_result(sample_csv: Path):
     sr = ScanResult(npi=VOLUME_NPI, provider_name="", overall_score=0.85)
     dossier = build_dossier(sample_csv, VOLUME_NPI, scan_result=sr)
     assert dossier.scan_result.overall_score == 0.85
+
+
+def test_peer_comparison_reuses_scan_totals(sample_csv: Path):
+    """A dossier built after scan_all uses the scan's provider totals and gets the same stats."""
+    import data.loader as loader
+    from scanner.anomalies import scan_all
+
+    loader.clear_provider_totals()
+    fresh = build_dossier(sample_csv, CLEAN_NPI).peer_comparison
+    loader.clear_provider_totals()
+    scan_all(sample_csv, threshold=0.0)
+    assert loader.cached_provider_totals(sample_csv) is not None
+    assert build_dossier(sample_csv, CLEAN_NPI).peer_comparison == fresh
+
+
+def test_dossier_skips_full_load_when_totals_are_cached(sample_csv: Path, monkeypatch):
+    """With scan totals recorded, the dossier reads only the provider's rows."""
+    import data.loader as loader
+    import profiler.dossier as dossier
+    from scanner.anomalies import scan_all
+
+    scan_all(sample_csv, threshold=0.0)
+    assert loader.cached_provider_totals(sample_csv) is not None
+
+    def full_load(*args, **kwargs):
+        raise AssertionError("load_claims should not be called")
+
+    monkeypatch.setattr(dossier, "load_claims", full_load)
+    assert build_dossier(sample_csv, CLEAN_NPI).peer_comparison["peer_count"] > 0
@@ -0,0 +1,184 @@
+"""Tests for dataset discovery, CSV-to-Parquet conversion and NPPES lookups."""
+
+import http.client
+import io
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import data.fetch as fetch
+from data.fetch import ensure_parquet, find_dataset
+from data.loader import load_claims
+from tests.conftest import CLEAN_NPI
+
+
+def _copy_csv(sample_csv: Path, tmp_path: Path) -> Path:
+    """Copy the shared sample CSV so conversions never touch the session fixture."""
+    return Path(shutil.copy(sample_csv, tmp_path / sample_csv.name))
+
+
+def test_find_dataset_converts_csv_to_parquet(sample_csv: Path, tmp_path: Path):
+    csv_path = _copy_csv(sample_csv, tmp_path)
+    path = find_dataset(tmp_path)
+    assert path == csv_path.with_suffix(".parquet")
+    assert path.exists()
+
+
+def test_find_dataset_falls_back_to_csv_when_not_writable(sample_csv: Path, tmp_path: Path, monkeypatch):
+    csv_path = _copy_csv(sample_csv, tmp_path)
+
+    def read_only(path: Path) -> Path:
+        raise PermissionError(f"Read-only file system: {path}")
+
+    monkeypatch.setattr(fetch, "ensure_parquet", read_only)
+    assert find_dataset(tmp_path) == csv_path
+
+
+def test_ensure_parquet_preserves_rows(sample_csv: Path, tmp_path: Path):
+    csv_path = _copy_csv(sample_csv, tmp_path)
+    csv_df = load_claims(csv_path)
+    parquet_df = load_claims(ensure_parquet(csv_path))
+    assert len(parquet_df) == len(csv_df)
+    assert CLEAN_NPI in set(parquet_df["npi"])
+
+
+def test_ensure_parquet_reuses_existing_file(sample_csv: Path, tmp_path: Path):
+    csv_path = _copy_csv(sample_csv, tmp_path)
+    first = ensure_parquet(csv_path)
+    mtime = first.stat().st_mtime_ns
+    assert ensure_parquet(csv_path).stat().st_mtime_ns == mtime
+
+
+def test_find_dataset_falls_back_to_csv_when_conversion_fails(tmp_path: Path):
+    csv_path = tmp_path / "claims.csv"
+    csv_path.write_text(
+        "BILLING_PROVIDER_NPI_NUM,HCPCS_CODE,CLAIM_FROM_MONTH,TOTAL_CLAIMS,TOTAL_PAID\n"
+        f"{CLEAN_NPI},99213,2024-01-01,10,not-a-number\n"
+    )
+    assert find_dataset(tmp_path) == csv_path
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["claims.csv"]
+
+
+def test_find_dataset_reconverts_replaced_csv(sample_csv: Path, tmp_path: Path):
+    csv_path = _copy_csv(sample_csv, tmp_path)
+    parquet_path = find_dataset(tmp_path)
+
+    rows = pd.read_csv(csv_path).head(5)
+    rows.to_csv(csv_path, index=False)
+    os.utime(csv_path, ns=(0, parquet_path.stat().st_mtime_ns + 1_000_000))
+    assert find_dataset(tmp_path) == parquet_path
+    assert len(load_claims(parquet_path)) == 5
+
+
+def _nppes_body(npi: str) -> bytes:
+    return json.dumps({
+        "result_count": 1,
+        "results": [{"enumeration_type": "NPI-2", "basic": {"organization_name": f"Org {npi}"}}],
+    }).encode()
+
+
+def test_lookup_npis_fetches_misses_and_caches(tmp_path: Path, monkeypatch):
+    calls = []
+
+    def fake_fetch(npi: str) -> tuple[bytes, dict]:
+        calls.append(npi)
+        body = _nppes_body(npi)
+        return body, json.loads(body)
+
+    monkeypatch.setattr(fetch, "NPPES_CACHE_FILE", tmp_path / "nppes_cache.sqlite")
+    monkeypatch.setattr(fetch, "_fetch_nppes", fake_fetch)
+    result = fetch.lookup_npis([CLEAN_NPI, "2000000002", CLEAN_NPI])
+    assert result[CLEAN_NPI]["name"] == f"Org {CLEAN_NPI}"
+    assert result["2000000002"]["enumeration_type"] == "NPI-2"
+    assert sorted(calls) == sorted([CLEAN_NPI, "2000000002"])
+
+    # Second lookup is served entirely from the on-disk cache
+    calls.clear()
+    assert fetch.lookup_npi(CLEAN_NPI)["name"] == f"Org {CLEAN_NPI}"
+    assert calls == []
+
+
+def test_lookup_npi_failure_is_not_cached(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(fetch, "NPPES_CACHE_FILE", tmp_path / "nppes_cache.sqlite")
+    monkeypatch.setattr(fetch, "_fetch_nppes", lambda npi: None)
+    assert fetch.lookup_npi(CLEAN_NPI) == {}
+    assert not (tmp_path / "nppes_cache.sqlite").exists()
+
+
+class _FakeResponse:
+    def __init__(self, status: int, body: bytes = b"", location: str | None = None):
+        self.status = status
+        self._body = body
+        self._location = location
+
+    def read(self) -> bytes:
+        return self._body
+
+    def getheader(self, name: str) -> str | None:
+        return self._location if name == "Location" else None
+
+
+class _FakeConnection:
+    """Stands in for the pooled HTTPSConnection, replaying scripted outcomes."""
+
+    def __init__(self, outcomes: list):
+        self.outcomes = outcomes
+        self.requests = 0
+
+    def request(self, method: str, path: str) -> None:
+        self.requests += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.response = outcome
+
+    def getresponse(self) -> _FakeResponse:
+        return self.response
+
+    def close(self) -> None:
+        pass
+
+
+def _install_connection(monkeypatch, conn: _FakeConnection) -> None:
+    monkeypatch.setattr(fetch._local, "conn", conn, raising=False)
+    monkeypatch.setattr(fetch.http.client, "HTTPSConnection", lambda *args, **kwargs: conn)
+
+
+def test_nppes_get_retries_dropped_keepalive_connection(monkeypatch):
+    conn = _FakeConnection([http.client.RemoteDisconnected("closed"), _FakeResponse(200, b"ok")])
+    _install_connection(monkeypatch, conn)
+    assert fetch._nppes_get(CLEAN_NPI) == b"ok"
+    assert conn.requests == 2
+
+
+def test_nppes_get_does_not_retry_timeouts_or_http_errors(monkeypatch):
+    conn = _FakeConnection([TimeoutError("timed out"), _FakeResponse(200, b"ok")])
+    _install_connection(monkeypatch, conn)
+    with pytest.raises(TimeoutError):
+        fetch._nppes_get(CLEAN_NPI)
+    assert conn.requests == 1
+
+    conn = _FakeConnection([_FakeResponse(500), _FakeResponse(200, b"ok")])
+    _install_connection(monkeypatch, conn)
+    with pytest.raises(http.client.HTTPException):
+        fetch._nppes_get(CLEAN_NPI)
+    assert conn.requests == 1
+
+
+def test_nppes_get_follows_redirects(monkeypatch):
+    conn = _FakeConnection([_FakeResponse(301, location="https://example.org/api/?number=1")])
+    _install_connection(monkeypatch, conn)
+    opened = []
+
+    def fake_urlopen(url: str, timeout: float) -> io.BytesIO:
+        opened.append(url)
+        return io.BytesIO(b"moved")
+
+    monkeypatch.setattr(fetch.urllib.request, "urlopen", fake_urlopen)
+    assert fetch._nppes_get(CLEAN_NPI) == b"moved"
+    assert opened == ["https://example.org/api/?number=1"]
+
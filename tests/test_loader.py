@@ -1,10 +1,12 @@
 """Tests for data loader."""
 
+import os
 from pathlib import Path
 
 import pandas as pd
 
-from data.loader import load_claims, load_claims_for_provider, get_all_providers
+import data.loader as loader
+from data.loader import load_claims, load_claims_for_provider, get_all_providers, preprocess
 from tests.conftest import CLEAN_NPI, VOLUME_NPI
 
 
@@ -13,9 +15,8 @@ def test_load_claims_returns_dataframe(sample_csv: Path):
     assert isinstance(df, pd.DataFrame)
 
 
-def test_load_claims_renames_columns(sample_csv: Path):
-    df = load_claims(sample_csv)
-    names = df.columns.tolist()
+def test_load_claims_renames_columns(sample_claims: pd.DataFrame):
+    names = sample_claims.columns.tolist()
     assert "npi" in names
     assert "service_month" in names
     assert "total_paid" in names
@@ -26,7 +27,7 @@ def test_load_claims_for_provider(sample_csv: Path):
     df = load_claims_for_provider(sample_csv, CLEAN_NPI)
     # Clean provider has 6 months * 2 procedure codes = 12 rows
     assert len(df) == 12
-    assert df["npi"].unique().tolist() == [CLEAN_NPI]
+    assert (df["npi"] == CLEAN_NPI).all()
 
 
 def test_load_claims_for_unknown_provider(sample_csv: Path):
@@ -35,9 +36,128 @@ def test_load_claims_for_unknown_provider(sample_csv: Path):
 
 
 def test_get_all_providers(sample_csv: Path):
-    df = get_all_providers(sample_csv)
-    npis = df["npi"].tolist()
+    npis = get_all_providers(sample_csv)
+    assert isinstance(npis, set)
     assert CLEAN_NPI in npis
     assert VOLUME_NPI in npis
     # 5 archetype providers + 20 filler providers
     assert len(npis) == 25
+
+
+def test_get_all_providers_parquet_matches_csv(sample_csv: Path, sample_parquet: Path):
+    assert get_all_providers(sample_parquet) == get_all_providers(sample_csv)
+
+
+def test_preprocess_monthly_matches_raw_aggregation(
+    sample_csv: Path, sample_claims: pd.DataFrame, tmp_path: Path, monkeypatch,
+):
+    monkeypatch.setattr(loader, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(loader, "PROVIDER_MONTHLY_FILE", tmp_path / "provider_monthly.parquet")
+    monkeypatch.setattr(loader, "PROVIDER_PROCEDURE_FILE", tmp_path / "provider_procedure.parquet")
+    monthly_path, procedure_path = preprocess(sample_csv)
+
+    raw = sample_claims
+    expected = (
+        raw.groupby(["npi", "service_month"], as_index=False)
+        .agg(total_claims=("total_claims", "sum"), total_paid=("total_paid", "sum"))
+        .sort_values(["npi", "service_month"])
+        .reset_index(drop=True)
+    )
+    monthly = pd.read_parquet(monthly_path)
+    assert monthly["npi"].is_monotonic_increasing
+    monthly = monthly.sort_values(["npi", "service_month"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(monthly[expected.columns.tolist()], expected)
+    assert "beneficiaries" in monthly.columns
+    assert len(pd.read_parquet(procedure_path)) == len(
+        raw[["npi", "procedure_code", "service_month"]].drop_duplicates()
+    )
+
+
+def test_preprocess_streams_raw_rows_in_batches(
+    sample_csv: Path, sample_claims: pd.DataFrame, tmp_path: Path, monkeypatch,
+):
+    """Partial sums from small batches re-aggregate to the full-dataset totals."""
+    monkeypatch.setattr(loader, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(loader, "PROVIDER_MONTHLY_FILE", tmp_path / "provider_monthly.parquet")
+    monkeypatch.setattr(loader, "PROVIDER_PROCEDURE_FILE", tmp_path / "provider_procedure.parquet")
+    iter_claims = loader.iter_claims
+    monkeypatch.setattr(loader, "iter_claims", lambda path, columns=None: iter_claims(path, columns, batch_size=37))
+    monkeypatch.setattr(loader, "load_claims", None)  # the raw file is never loaded whole
+
+    monthly_path, _ = preprocess(sample_csv)
+    monthly = pd.read_parquet(monthly_path)
+    totals = monthly.groupby("npi")["total_paid"].sum()
+    expected = sample_claims.groupby("npi")["total_paid"].sum()
+    pd.testing.assert_series_equal(totals, expected, check_dtype=False)
+    assert monthly.duplicated(["npi", "service_month"]).sum() == 0
+
+
+def test_preprocess_keeps_spend_without_procedure_code(tmp_path: Path, monkeypatch):
+    """Rows missing HCPCS_CODE still count toward the monthly summary."""
+    monkeypatch.setattr(loader, "PROCESSED_DIR", tmp_path)
+    monkeypatch.setattr(loader, "PROVIDER_MONTHLY_FILE", tmp_path / "provider_monthly.parquet")
+    monkeypatch.setattr(loader, "PROVIDER_PROCEDURE_FILE", tmp_path / "provider_procedure.parquet")
+    raw_path = tmp_path / "claims.csv"
+    pd.DataFrame({
+        "BILLING_PROVIDER_NPI_NUM": [CLEAN_NPI] * 3,
+        "HCPCS_CODE": ["99213", "99214", None],
+        "CLAIM_FROM_MONTH": ["2024-01-01"] * 3,
+        "TOTAL_CLAIMS": [10, 10, 10],
+        "TOTAL_PAID": [100.0, 100.0, 100.0],
+    }).to_csv(raw_path, index=False)
+
+    monthly_path, procedure_path = preprocess(raw_path)
+    monthly = pd.read_parquet(monthly_path)
+    assert monthly["total_claims"].tolist() == [30]
+    assert monthly["total_paid"].tolist() == [300.0]
+    assert sorted(pd.read_parquet(procedure_path)["procedure_code"]) == ["99213", "99214"]
+
+
+def test_load_claims_reads_only_requested_columns(sample_csv: Path):
+    df = load_claims(sample_csv, columns=["npi", "total_paid"])
+    assert sorted(df.columns) == ["npi", "total_paid"]
+
+
+def test_load_claims_for_provider_parquet_projection(sample_parquet: Path):
+    df = load_claims_for_provider(sample_parquet, CLEAN_NPI, columns=["total_paid"])
+    assert sorted(df.columns) == ["npi", "total_paid"]
+    assert len(df) == 12
+
+
+def test_read_schema_refreshes_when_file_changes(sample_csv: Path, tmp_path: Path):
+    parquet_path = tmp_path / "claims.parquet"
+    raw = pd.read_csv(sample_csv)
+    raw.to_parquet(parquet_path, index=False)
+    assert loader.read_schema(parquet_path) is loader.read_schema(parquet_path)
+
+    raw[["BILLING_PROVIDER_NPI_NUM", "TOTAL_PAID"]].to_parquet(parquet_path, index=False)
+    os.utime(parquet_path, ns=(0, parquet_path.stat().st_mtime_ns + 1_000_000))
+    assert loader.read_schema(parquet_path).names == ["BILLING_PROVIDER_NPI_NUM", "TOTAL_PAID"]
+
+
+def test_load_claims_returns_independent_frames(sample_csv: Path):
+    first = load_claims(sample_csv, columns=["npi", "total_paid"])
+    first["npi"] = "changed"
+    second = load_claims(sample_csv, columns=["npi", "total_paid"])
+    assert "changed" not in set(second["npi"])
+
+
+def test_iter_claims_batches_cover_all_rows(
+    sample_csv: Path, sample_parquet: Path, sample_claims: pd.DataFrame,
+):
+    expected = len(sample_claims)
+
+    for path in (sample_csv, sample_parquet):
+        batches = list(loader.iter_claims(path, columns=["npi", "total_paid"], batch_size=50))
+        assert len(batches) > 1
+        assert sum(len(b) for b in batches) == expected
+        assert all(sorted(b.columns) == ["npi", "total_paid"] for b in batches)
+
+
+def test_load_claims_for_providers_splits_by_npi(sample_csv: Path, sample_parquet: Path):
+    for path in (sample_csv, sample_parquet):
+        by_npi = loader.load_claims_for_providers(path, [CLEAN_NPI, VOLUME_NPI, "0000000000"])
+        assert list(by_npi) == [CLEAN_NPI, VOLUME_NPI, "0000000000"]
+        assert len(by_npi[CLEAN_NPI]) == 12
+        assert (by_npi[VOLUME_NPI]["npi"] == VOLUME_NPI).all()
+        assert by_npi["0000000000"].empty
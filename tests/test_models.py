@@ -9,6 +9,11 @@ def test_red_flag_type_values():
     assert len(RedFlagType) == 6
 
 
+def test_red_flag_type_set_membership():
+    types = {RedFlagType.BILLING_SPIKE, RedFlagType("billing_spike"), RedFlagType["REVENUE_OUTLIER"]}
+    assert types == {RedFlagType.BILLING_SPIKE, RedFlagType.REVENUE_OUTLIER}
+
+
 def test_provider_defaults():
     p = Provider(npi="123")
     assert p.billing_npi == ""
@@ -21,6 +26,23 @@ def test_scan_result_defaults():
     assert r.total_billed == 0.0
 
 
+def test_scan_result_flag_types():
+    flags = [
+        RedFlag(flag_type=RedFlagType.BILLING_SPIKE, description="", severity=0.5),
+        RedFlag(flag_type=RedFlagType.BILLING_SPIKE, description="", severity=0.7),
+        RedFlag(flag_type=RedFlagType.REVENUE_OUTLIER, description="", severity=0.4),
+    ]
+    r = ScanResult(npi="123", provider_name="", overall_score=0.5, red_flags=flags)
+    assert r.flag_types == {"billing_spike", "revenue_outlier"}
+    assert ScanResult(npi="123", provider_name="", overall_score=0.0).flag_types == frozenset()
+
+
+def test_scan_result_flag_types_follow_red_flags():
+    r = ScanResult(npi="123", provider_name="", overall_score=0.0)
+    r.red_flags.append(RedFlag(flag_type=RedFlagType.BILLING_SPIKE, description="", severity=0.5))
+    assert r.flag_types == {"billing_spike"}
+
+
 def test_dossier_construction():
     p = Provider(npi="123")
     sr = ScanResult(npi="123", provider_name="", overall_score=0.8)
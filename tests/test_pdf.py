@@ -3,12 +3,13 @@
 from pathlib import Path
 
 from data.models import Dossier, Provider, RedFlag, RedFlagType, ScanResult
-from reports.pdf import generate_dossier_pdf
+from reports.pdf import generate_dossier_pdf, generate_dossiers_pdf
 
 
-def test_generate_pdf_creates_file(tmp_path: Path):
-    provider = Provider(npi="1234567890")
-    scan_result = ScanResult(
+# generate_dossier_pdf only reads the dossier, so the inputs are built once
+_FULL_DOSSIER = Dossier(
+    provider=Provider(npi="1234567890"),
+    scan_result=ScanResult(
         npi="1234567890",
         provider_name="",
         overall_score=0.75,
@@ -20,31 +21,35 @@ def test_generate_pdf_creates_file(tmp_path: Path):
                 evidence={"month": "2024-01-01", "claims": 5000},
             ),
         ],
-    )
-    dossier = Dossier(
-        provider=provider,
-        scan_result=scan_result,
-        claims_summary={
-            "total_claims": 5000,
-            "total_paid": 100000.00,
-            "total_beneficiaries": 800,
-            "active_months": 6,
-        },
-        peer_comparison={
-            "peer_count": 200,
-            "provider_total_paid": 100000.00,
-            "peer_mean_paid": 50000.00,
-            "peer_median_paid": 45000.00,
-            "provider_percentile": 95.0,
-            "zscore": 3.2,
-        },
-        timeline=[
-            {"month": "2024-01-01", "total_claims": 500, "total_paid": 12500.00},
-            {"month": "2024-02-01", "total_claims": 450, "total_paid": 11250.00},
-        ],
-    )
+    ),
+    claims_summary={
+        "total_claims": 5000,
+        "total_paid": 100000.00,
+        "total_beneficiaries": 800,
+        "active_months": 6,
+    },
+    peer_comparison={
+        "peer_count": 200,
+        "provider_total_paid": 100000.00,
+        "peer_mean_paid": 50000.00,
+        "peer_median_paid": 45000.00,
+        "provider_percentile": 95.0,
+        "zscore": 3.2,
+    },
+    timeline=[
+        {"month": "2024-01-01", "total_claims": 500, "total_paid": 12500.00},
+        {"month": "2024-02-01", "total_claims": 450, "total_paid": 11250.00},
+    ],
+)
+
+_MINIMAL_DOSSIER = Dossier(
+    provider=Provider(npi="0000000000"),
+    scan_result=ScanResult(npi="0000000000", provider_name="", overall_score=0.0),
+)
 
-    pdf_path = generate_dossier_pdf(dossier, output_dir=tmp_path)
+
+def test_generate_pdf_creates_file(tmp_path: Path):
+    pdf_path = generate_dossier_pdf(_FULL_DOSSIER, output_dir=tmp_path)
     assert pdf_path.exists()
     assert pdf_path.suffix == ".pdf"
     assert pdf_path.stat().st_size > 0
@@ -52,10 +57,20 @@ def test_generate_pdf_creates_file(tmp_path: Path):
 
 def test_generate_pdf_minimal_dossier(tmp_path: Path):
     """PDF generation should work even with minimal data."""
-    provider = Provider(npi="0000000000")
-    scan_result = ScanResult(npi="0000000000", provider_name="", overall_score=0.0)
-    dossier = Dossier(provider=provider, scan_result=scan_result)
-
-    pdf_path = generate_dossier_pdf(dossier, output_dir=tmp_path)
+    pdf_path = generate_dossier_pdf(_MINIMAL_DOSSIER, output_dir=tmp_path)
     assert pdf_path.exists()
     assert pdf_path.stat().st_size > 0
+
+
+def test_generate_dossiers_pdf_batch(tmp_path: Path):
+    dossiers = [
+        Dossier(
+            provider=Provider(npi=npi),
+            scan_result=ScanResult(npi=npi, provider_name="", overall_score=0.5),
+        )
+        for npi in ("1111111111", "2222222222", "3333333333")
+    ]
+
+    paths = generate_dossiers_pdf(dossiers, output_dir=tmp_path, max_workers=2)
+    assert [p.name.split("_")[1] for p in paths] == ["1111111111", "2222222222", "3333333333"]
+    assert all(p.exists() and p.stat().st_size > 0 for p in paths)
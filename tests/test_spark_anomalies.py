@@ -5,9 +5,6 @@ Uses the same synthetic dataset as conftest.py via a shared SparkSession fixture
 SparkSession is session-scoped so it is created once per test run (startup is ~5s).
 """
 
-import csv
-from pathlib import Path
-
 import pytest
 
 pytest.importorskip("pyspark", reason="pyspark not installed")
@@ -37,7 +34,6 @@ from tests.conftest import (
     REVENUE_NPI,
     SPIKE_NPI,
     VOLUME_NPI,
-    _generate_rows,
 )
 
 
@@ -54,27 +50,14 @@ def spark() -> Iterator[SparkSession]:
 
 
 @pytest.fixture(scope="session")
-def sample_csv_session(tmp_path_factory) -> Path:
-    tmp = tmp_path_factory.mktemp("spark_data")
-    filepath = tmp / "test_claims.csv"
-    rows = _generate_rows()
-    fieldnames = list(rows[0].keys())
-    with open(filepath, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-    return filepath
-
-
-@pytest.fixture(scope="session")
-def monthly(spark, sample_csv_session):
-    df = load_claims(spark, sample_csv_session)
+def monthly(spark, sample_csv):
+    df = load_claims(spark, sample_csv)
     return build_monthly_summary(df).cache()
 
 
 @pytest.fixture(scope="session")
-def procedure(spark, sample_csv_session):
-    df = load_claims(spark, sample_csv_session)
+def procedure(spark, sample_csv):
+    df = load_claims(spark, sample_csv)
     return build_procedure_summary(df).cache()
 
 
@@ -82,8 +65,8 @@ def procedure(spark, sample_csv_session):
 # loader tests
 # ---------------------------------------------------------------------------
 
-def test_load_claims_normalizes_columns(spark, sample_csv_session):
-    df = load_claims(spark, sample_csv_session)
+def test_load_claims_normalizes_columns(spark, sample_csv):
+    df = load_claims(spark, sample_csv)
     assert "npi" in df.columns
     assert "total_claims" in df.columns
     assert "total_paid" in df.columns
@@ -92,8 +75,8 @@ def test_load_claims_normalizes_columns(spark, sample_csv_session):
     assert "BILLING_PROVIDER_NPI_NUM" not in df.columns
 
 
-def test_load_claims_npi_is_string(spark, sample_csv_session):
-    df = load_claims(spark, sample_csv_session)
+def test_load_claims_npi_is_string(spark, sample_csv):
+    df = load_claims(spark, sample_csv)
     npi_type = dict(df.dtypes)["npi"]
     assert npi_type == "string"
 